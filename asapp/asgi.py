@@ -0,0 +1,24 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asapp.settings')
+django_application = get_asgi_application()
+
+# Load the intent model at server start, as in wsgi.py
+from django.conf import settings  # noqa: E402
+
+if settings.INTENT_WARMUP:
+    from support.intent_classifier import warmup  # noqa: E402
+    warmup(background=(settings.INTENT_WARMUP == 'background'))
+
+from support.websocket import chat_socket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # WebSocket chat channel (support/websocket.py); everything else is plain Django
+    if scope['type'] == 'websocket':
+        if scope['path'] == settings.CHAT_SOCKET_PATH:
+            return await chat_socket(scope, receive, send)
+        await receive()
+        return await send({'type': 'websocket.close', 'code': 4404})
+    return await django_application(scope, receive, send)
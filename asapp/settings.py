@@ -24,6 +24,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    # Outermost after CORS so session loads/saves are counted too
+    'support.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +54,16 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'asapp.wsgi.application'
+ASGI_APPLICATION = 'asapp.asgi.application'
+
+# Serve the chat and booking read endpoints with the async views in
+# support/async_views.py; turn on when running under ASGI (e.g. uvicorn asapp.asgi:application)
+ASYNC_VIEWS = os.environ.get('ASAPP_ASYNC_VIEWS', '') == '1'
+# Persistent chat channel served by asapp/asgi.py (ASGI only), and the broker
+# that pushes booking/flight updates to it; 'inprocess' only reaches sockets in
+# the same worker process (see support/broker.py)
+CHAT_SOCKET_PATH = '/ws/chat'
+CHAT_BROKER = 'inprocess'
 
 # Database
 DATABASES = {
@@ -61,6 +73,42 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile (ASAPP_DB_PROFILE=production): WAL so readers don't
+# block the writers (cancellations, audit log) and vice versa, pragmas applied on
+# every new connection, persistent connections, and a read-only connection that
+# support/db_router.py sends booking lookups to. Compare with
+# tools/benchmark_sqlite_profile.py
+DB_PROFILE = os.environ.get('ASAPP_DB_PROFILE', 'development')
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'      # durable at checkpoints; safe with WAL
+    'PRAGMA cache_size=-65536;'       # 64 MiB page cache per connection
+    'PRAGMA mmap_size=268435456;'     # 256 MiB memory-mapped reads
+    'PRAGMA busy_timeout=5000;'
+    'PRAGMA temp_store=MEMORY;'
+)
+if DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS,
+            # Take the write lock at BEGIN so concurrent writers queue on busy_timeout
+            # instead of failing when a read transaction tries to upgrade
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,
+        },
+    })
+    DATABASES['readonly'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DATABASES['default']['NAME'],
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'init_command': SQLITE_PRAGMAS + 'PRAGMA query_only=ON;', 'timeout': 5},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['support.db_router.ReadOnlyBookingRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -75,3 +123,108 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 CORS_ALLOW_ALL_ORIGINS = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Intent classification
+INTENT_CACHE_SIZE = 1024  # max cached query classifications per process (0 disables)
+INTENT_CACHE_TTL = None   # seconds before a cached classification expires (None = never)
+# Example embeddings are cached here, keyed by a hash of the model and examples
+INTENT_ARTIFACT_DIR = BASE_DIR / 'var' / 'intent_index'
+# Load the classifier when the WSGI/ASGI app is imported: 'blocking' (the import
+# waits for the model; with gunicorn --preload workers fork with it already
+# loaded), 'background' (serve while loading, /api/ready reports 503 until warm)
+# or None (load on first message). Only use 'background' when the app is
+# imported in the process that serves it (no --preload or other fork after
+# import): a worker forked mid-load doesn't inherit the loading thread and
+# loads the model again itself
+INTENT_WARMUP = 'blocking'
+# Sentence encoder: 'torch' (sentence-transformers), 'onnx' or 'onnx-int8'
+# (ONNX Runtime with dynamically quantized weights; needs onnxruntime and is
+# exported into INTENT_ARTIFACT_DIR on first use). Compare with tools/benchmark_backends.py
+INTENT_BACKEND = 'torch'
+# Threads the async views use for intent classification (bounds concurrent encodes)
+INTENT_EXECUTOR_WORKERS = 4
+# Micro-batching: concurrent request threads that miss the cache are encoded
+# together, waiting at most INTENT_MICROBATCH_WINDOW_MS for others to join
+INTENT_MICROBATCH = False
+INTENT_MICROBATCH_WINDOW_MS = 3.0
+INTENT_MICROBATCH_MAX_SIZE = 32
+# Seconds a request waits for its batch before classifying the query itself
+INTENT_MICROBATCH_TIMEOUT = 2.0
+# Shared classifier: when set, web workers send queries to the process started by
+# `manage.py run_classifier_server` over this Unix socket instead of loading the
+# model themselves (falling back to keyword matching if the socket is down)
+INTENT_SERVER_SOCKET = None  # e.g. '/run/asapp/intent.sock'
+INTENT_SERVER_POOL_SIZE = 4
+INTENT_SERVER_TIMEOUT = 2.0
+# Answer queries whose keywords point at exactly one intent without running the model
+INTENT_KEYWORD_FAST_PATH = True
+# How queries are matched against the examples: 'brute' (exact, one matmul),
+# 'centroid' (prune to the INTENT_INDEX_TOP_K closest intent centroids, then
+# exact rescoring) or 'ivf' (k-means cells, scan INTENT_IVF_NPROBE of them).
+# Worth switching once intent_examples grows into the thousands; see
+# tools/benchmark_intent_index.py
+INTENT_INDEX = 'brute'
+INTENT_INDEX_TOP_K = 8
+INTENT_IVF_NLIST = None  # default sqrt(number of examples)
+INTENT_IVF_NPROBE = 8
+
+# Serve in-process counters (dialog handler timings, cache hit rates...) at /api/metrics
+METRICS_ENABLED = DEBUG
+# Per-request query counts and DB time (support/query_budget.py): sent as
+# X-DB-Queries / X-DB-Time-Ms headers, and a SQL shape repeated
+# QUERY_REPEAT_THRESHOLD times in one request is reported as a possible N+1.
+# Budgets per endpoint are checked by tools/check_query_budgets.py
+QUERY_BUDGET_HEADERS = DEBUG
+QUERY_REPEAT_THRESHOLD = 3
+
+# Caches: 'bookings' holds the serialized active-bookings list per PNR and can
+# point at any Django cache backend (e.g. Redis) without code changes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'bookings': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'active-bookings',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Read tier for chat sessions; use a shared backend when running several workers
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chat-sessions',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+BOOKINGS_CACHE_ALIAS = 'bookings'
+BOOKINGS_CACHE_TTL = 300  # seconds; signals invalidate on every booking change
+
+# Write-behind for Message/ProcessLog rows (support/audit.py): queued on the
+# request path and bulk-inserted by a background thread every
+# AUDIT_BATCH_SIZE rows or AUDIT_FLUSH_INTERVAL_MS. A full queue blocks the
+# request until the writer catches up; nothing is dropped
+AUDIT_WRITE_BEHIND = True
+AUDIT_QUEUE_SIZE = 10000
+AUDIT_BATCH_SIZE = 200
+AUDIT_FLUSH_INTERVAL_MS = 200
+
+# Retention: `manage.py archive_logs` (run it from cron) moves audit rows older
+# than RETENTION_DAYS, and the oldest rows beyond RETENTION_MAX_ROWS, into
+# gzip JSONL files per day under RETENTION_ARCHIVE_DIR (see support/retention.py)
+RETENTION_ARCHIVE_DIR = BASE_DIR / 'var' / 'archive'
+RETENTION_DAYS = {'message': 30, 'processlog': 90}
+RETENTION_MAX_ROWS = {'message': 1_000_000, 'processlog': 1_000_000}
+
+# Booking listings (/api/bookings, /api/cancelled_bookings, /api/flight/booking):
+# ?limit=&cursor= returns keyset pages, ?stream=1 streams the full list read in
+# chunks of LISTING_STREAM_CHUNK_SIZE rows (see support/pagination.py)
+LISTING_PAGE_SIZE = 50      # when only a cursor is given
+LISTING_MAX_PAGE_SIZE = 500
+LISTING_STREAM_CHUNK_SIZE = 500
+
+# How long a stored response is replayed for a repeated Idempotency-Key (support/idempotency.py)
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# Sessions: cache-first reads with the DB as durable tier, and no write when a
+# chat turn leaves the dialog state unchanged
+SESSION_ENGINE = 'support.session_backend'
+SESSION_CACHE_ALIAS = 'sessions'
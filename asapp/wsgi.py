@@ -3,3 +3,12 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asapp.settings')
 application = get_wsgi_application()
+
+# Load the intent model at server start instead of on the first chat message
+# (see INTENT_WARMUP in settings.py for how this interacts with gunicorn --preload).
+# Only servers import this module, so manage.py commands and migrations skip it.
+from django.conf import settings  # noqa: E402
+
+if settings.INTENT_WARMUP:
+    from support.intent_classifier import warmup  # noqa: E402
+    warmup(background=(settings.INTENT_WARMUP == 'background'))
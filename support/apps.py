@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class SupportConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'support'
+
+    def ready(self):
+        # Cache invalidation and socket pushes for booking writes
+        from . import signals  # noqa: F401
+        # Query accounting wrapper on every new DB connection
+        from . import query_budget  # noqa: F401
@@ -0,0 +1,240 @@
+"""
+Async versions of the chat and booking read endpoints for ASGI deployments.
+
+They mirror the views in views.py but use Django's async ORM API, run intent
+classification on a bounded thread pool (aget_intent) and reuse the same
+dialog table: read-only handlers have async twins below, the rest run in a
+worker thread via DialogEngine.adispatch. Enabled with ASYNC_VIEWS = True.
+"""
+import json
+import random
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from . import audit, services
+from .intent_classifier import aget_intent
+from .models import Message, ProcessLog
+from .serializers import BookingSerializer, CancelledBookingSerializer, VerifyPNRSerializer
+from .dialog import DialogContext
+from .pagination import (
+    BOOKING_KEY, CANCELLATION_KEY, ajson_array_chunks, akeyset_page, json_stream_response, keyset,
+    stream_chunk_size,
+)
+from .streaming import reply_events, sse_error_response, sse_event, sse_response
+from .views import (
+    CONVERSATION_STATES, INVALID_CHAT_REQUEST, _mock_booking_response, _page_request, _policy_reply, chat_payload,
+    dialog, handle_booked_flights, handle_cancel, handle_pets, handle_seat, handle_status,
+)
+
+
+async def _active_bookings_reply(ctx, reply):
+    bookings = await services.aactive_bookings_data(ctx.verified_pnr)
+    return JsonResponse({'reply': reply, 'action': 'list_bookings', 'bookings': bookings})
+
+
+@dialog.async_version(handle_booked_flights)
+async def ahandle_booked_flights(ctx):
+    return await _active_bookings_reply(ctx, 'Here are your bookings')
+
+
+@dialog.async_version(handle_cancel)
+async def ahandle_cancel(ctx):
+    if not ctx.booking_id:
+        return await _active_bookings_reply(ctx, 'Please choose a booking for that action.')
+    return JsonResponse({'reply': 'Are you sure you want to cancel this booking?', 'action': 'confirm_cancel', 'booking_id': ctx.booking_id})
+
+
+@dialog.async_version(handle_status)
+async def ahandle_status(ctx):
+    if not ctx.booking_id:
+        return await _active_bookings_reply(ctx, 'Please choose a booking for that action.')
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    booking = await services.aget_booking(ctx.booking_id)
+    if booking is None:
+        return await _active_bookings_reply(ctx, 'Which booking would you like to check?')
+    flight_status = random.choice(['On Time', 'Departed', 'Arrived', 'Delayed'])
+    return JsonResponse({'reply': f'Flight {booking.flight_id} status: {flight_status}', 'booking': BookingSerializer(booking).data})
+
+
+@dialog.async_version(handle_seat)
+async def ahandle_seat(ctx):
+    if not ctx.booking_id:
+        return await _active_bookings_reply(ctx, 'Please choose a booking for that action.')
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    booking = await services.aget_booking(ctx.booking_id)
+    if booking is None:
+        return await _active_bookings_reply(ctx, 'Select booking to check seats for.')
+    return JsonResponse({'reply': f'Your assigned seat is: {booking.assigned_seat}', 'booking': BookingSerializer(booking).data})
+
+
+@dialog.async_version(handle_pets)
+async def ahandle_pets(ctx):
+    if not ctx.booking_id:
+        return await _active_bookings_reply(ctx, 'Please choose a booking for that action.')
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    allowed = random.choice([True, False])
+    note = 'Pet allowed in cabin' if allowed else 'Pet not allowed for this fare/class'
+    try:
+        booking = await services.aget_booking(ctx.booking_id)
+        if booking is not None:
+            await audit.arecord(ProcessLog(action='pets', booking=booking, pnr=booking.pnr, payload={'booking_id': ctx.booking_id}, result={'pet_allowed': allowed, 'note': note}))
+    except Exception:
+        pass
+    return JsonResponse({'reply': note, 'pet_allowed': allowed})
+
+
+@csrf_exempt
+async def process_message(request):
+    payload = chat_payload(request)
+    if payload is None:
+        return JsonResponse(INVALID_CHAT_REQUEST, status=400)
+    return await chat_turn(request, payload)
+
+
+async def chat_turn(request, payload):
+    """One dialog turn; shared by process_message and the chat WebSocket (support/websocket.py)"""
+    ctx = await DialogContext.abuild(request, payload)
+
+    # Persist user message
+    try:
+        await audit.arecord(Message(session_key=request.session.session_key, sender='user', text=ctx.msg, pnr=ctx.verified_pnr))
+    except Exception:
+        pass
+
+    if not ctx.verified_pnr:
+        return JsonResponse({'reply': 'Please verify your PNR first by clicking the bot and entering your PNR.', 'need_pnr': True})
+
+    if ctx.payload_booking_id:
+        await request.session.aset('selected_booking_id', ctx.payload_booking_id)
+        if ctx.msg.strip() == 'select':
+            return JsonResponse({'reply': 'Booking selected'})
+
+    state = ctx.state if ctx.state in CONVERSATION_STATES else None
+    if state is None and ctx.msg.strip() != 'select':
+        try:
+            ctx.intent, ctx.confidence = await aget_intent(ctx.msg)
+        except Exception as e:
+            print(f"Intent classification error: {e}")
+            return JsonResponse({'reply': 'Invalid query'})
+        if ctx.intent is None:
+            return JsonResponse({'reply': 'Invalid query'})
+
+    return await dialog.adispatch(ctx, state, ctx.intent)
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+async def process_message_stream(request):
+    payload = chat_payload(request)
+    if payload is None:
+        return sse_error_response(INVALID_CHAT_REQUEST)
+
+    async def events():
+        yield sse_event('typing', {})
+        try:
+            response = await chat_turn(request, payload)
+        except Exception as e:
+            print(f"Chat turn failed: {e}")
+            yield sse_event('error', {'reply': 'Sorry, something went wrong. Please try again.'})
+            return
+        # SessionMiddleware has already run by the time the body is streamed
+        if request.session.modified:
+            await request.session.asave()
+        for event in reply_events(json.loads(response.content)):
+            yield event
+
+    return sse_response(events())
+
+
+@csrf_exempt
+async def verify_pnr(request):
+    try:
+        payload = json.loads(request.body)
+    except Exception:
+        return JsonResponse({'message': 'Invalid Request'}, status=400)
+    ser = VerifyPNRSerializer(data=payload)
+    if not ser.is_valid():
+        return JsonResponse({'message': 'Invalid input', 'errors': ser.errors}, status=400)
+    pnr = ser.validated_data['pnr']
+    exists = await services.apnr_exists(pnr)
+    if exists:
+        await request.session.aset('verified_pnr', pnr)
+        try:
+            await audit.arecord(ProcessLog(action='verify_pnr', pnr=pnr, payload={'exists': True}, result={'exists': True}))
+        except Exception:
+            pass
+    return JsonResponse({'pnr': pnr, 'exists': exists})
+
+
+async def _alisting_response(page, queryset, key, serializer_class, if_empty=None):
+    """Async views._listing_response: streamed rows come from .aiterator()"""
+    if page.stream:
+        rows = keyset(queryset, key, page.cursor).aiterator(chunk_size=stream_chunk_size())
+        first = await anext(rows, None)
+        if first is None and if_empty is not None and not page.cursor:
+            return if_empty()
+        return json_stream_response(ajson_array_chunks(rows, serializer_class, first))
+    rows, next_cursor = await akeyset_page(queryset, key, page.limit, page.cursor)
+    if not rows and if_empty is not None and not page.cursor:
+        return if_empty()
+    return JsonResponse({'results': serializer_class(rows, many=True).data, 'next_cursor': next_cursor})
+
+
+async def api_get_booking(request):
+    pnr = request.GET.get('pnr')
+    if not pnr:
+        return JsonResponse({'message': 'PNR Not Found'}, status=404)
+    page, error = _page_request(request)
+    if error:
+        return error
+    if page.paginated or page.stream:
+        return await _alisting_response(page, services.bookings_query(pnr), BOOKING_KEY, BookingSerializer,
+                                        if_empty=lambda: _mock_booking_response(pnr))
+    bookings = await services.afind_bookings(pnr)
+    if bookings:
+        return JsonResponse(BookingSerializer(bookings, many=True).data, safe=False)
+    return _mock_booking_response(pnr)
+
+
+@csrf_exempt
+async def api_list_bookings_by_pnr(request):
+    pnr = request.GET.get('pnr')
+    if not pnr:
+        return JsonResponse({'message': 'PNR required'}, status=400)
+    page, error = _page_request(request)
+    if error:
+        return error
+    if page.paginated or page.stream:
+        return await _alisting_response(page, services.active_bookings_query(pnr), BOOKING_KEY,
+                                        BookingSerializer)
+    return JsonResponse(await services.aactive_bookings_data(pnr), safe=False)
+
+
+@csrf_exempt
+async def api_get_booking_by_id(request, booking_id):
+    booking = await services.aget_booking(booking_id)
+    if booking is None:
+        return JsonResponse({'message': 'Booking not found'}, status=404)
+    return JsonResponse(BookingSerializer(booking).data)
+
+
+async def api_cancelled_bookings(request):
+    pnr = request.GET.get('pnr')
+    if not pnr:
+        return JsonResponse({'message': 'PNR required'}, status=400)
+    page, error = _page_request(request)
+    if error:
+        return error
+    if page.paginated or page.stream:
+        return await _alisting_response(page, services.cancellations_query(pnr), CANCELLATION_KEY,
+                                        CancelledBookingSerializer)
+    cancelled = await services.acancelled_bookings(pnr)
+    return JsonResponse(CancelledBookingSerializer(cancelled, many=True).data, safe=False)
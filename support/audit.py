@@ -0,0 +1,230 @@
+"""
+Write-behind for the audit rows (Message, ProcessLog) written on the request path.
+
+Views call record() with an unsaved instance instead of objects.create(). The
+instance goes on a bounded in-process queue and a background thread inserts
+queued rows with one bulk_create per model, every AUDIT_BATCH_SIZE rows or
+AUDIT_FLUSH_INTERVAL_MS, whichever comes first. That turns one SQLite write
+transaction per row into one per batch.
+
+A full queue blocks the caller until the writer catches up (backpressure), so
+records are never dropped for lack of space. The queue is drained at process
+exit. Rows get their id and final created_at when flushed, so created_at can
+trail the request by up to one flush interval; ids keep the enqueue order.
+
+With AUDIT_WRITE_BEHIND off, record() saves synchronously as before.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import normalize_pnr
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class AuditWriter:
+    def __init__(self, max_queue=10000, batch_size=200, flush_interval_ms=200):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {'queued': 0, 'written': 0, 'failed': 0, 'flushes': 0, 'blocked': 0,
+                          'flush_ms_total': 0.0, 'flush_ms_max': 0.0, 'flush_ms_last': 0.0}
+
+    def _ensure_started(self):
+        # Started lazily and per process, so forking servers (gunicorn --preload) get a live thread
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return True
+        with self._start_lock:
+            if self._closed:
+                return False
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+        return True
+
+    def record(self, instance):
+        """Queue an unsaved model instance for insertion; blocks while the queue is full"""
+        if not self._ensure_started():
+            instance.save()
+            return instance
+        while True:
+            try:
+                self._queue.put(instance, timeout=0.5)
+                break
+            except queue.Full:
+                with self._stats_lock:
+                    self._counters['blocked'] += 1
+                if not self._thread.is_alive():
+                    # Writer is gone (interpreter shutting down): don't wait forever
+                    instance.save()
+                    return instance
+        with self._stats_lock:
+            self._counters['queued'] += 1
+        return instance
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                if batch:
+                    self._flush(batch)
+        finally:
+            close_old_connections()
+
+    def _next_batch(self):
+        """Up to batch_size rows, waiting at most flush_interval after the first; None once closed and empty"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return None if self._closed else []
+        if first is None:
+            self._queue.task_done()
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Close sentinel: flush what we have, then stop on the next call
+                self._queue.task_done()
+                self._closed = True
+                break
+            batch.append(item)
+        return batch
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        written = failed = 0
+        by_model = {}
+        for instance in batch:
+            by_model.setdefault(type(instance), []).append(instance)
+        for model, instances in by_model.items():
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(instances)
+                written += len(instances)
+            except Exception as e:
+                # One bad row (e.g. its booking was deleted meanwhile) shouldn't lose the batch
+                print(f'Audit batch insert failed ({model.__name__}, {len(instances)} rows): {e}')
+                for instance in instances:
+                    try:
+                        instance.save()
+                        written += 1
+                    except Exception as row_error:
+                        failed += 1
+                        print(f'Audit row dropped ({model.__name__}): {row_error}')
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            c = self._counters
+            c['written'] += written
+            c['failed'] += failed
+            c['flushes'] += 1
+            c['flush_ms_total'] += elapsed_ms
+            c['flush_ms_last'] = elapsed_ms
+            c['flush_ms_max'] = max(c['flush_ms_max'], elapsed_ms)
+        for _ in batch:
+            self._queue.task_done()
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._closed = True
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._closed = True
+
+    def stats(self):
+        with self._stats_lock:
+            c = dict(self._counters)
+        flushes = c.pop('flushes')
+        total = c.pop('flush_ms_total')
+        return {
+            'enabled': True,
+            'queue_depth': self._queue.qsize(),
+            'queue_max': self._queue.maxsize,
+            'flushes': flushes,
+            'flush_ms_mean': total / flushes if flushes else 0.0,
+            **c,
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """The process-wide AuditWriter, or None when AUDIT_WRITE_BEHIND is off"""
+    global _writer
+    if not _setting('AUDIT_WRITE_BEHIND', False):
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter(
+                    max_queue=_setting('AUDIT_QUEUE_SIZE', 10000),
+                    batch_size=_setting('AUDIT_BATCH_SIZE', 200),
+                    flush_interval_ms=_setting('AUDIT_FLUSH_INTERVAL_MS', 200),
+                )
+                atexit.register(_writer.close)
+    return _writer
+
+
+def record(instance):
+    """Insert an audit row (Message/ProcessLog), write-behind when enabled"""
+    # bulk_create skips Model.save(), so apply what save() would
+    if getattr(instance, 'pnr', None):
+        instance.pnr = normalize_pnr(instance.pnr)
+    if instance.created_at is None:
+        instance.created_at = timezone.now()
+    writer = get_writer()
+    if writer is None:
+        instance.save()
+        return instance
+    return writer.record(instance)
+
+
+async def arecord(instance):
+    writer = get_writer()
+    if writer is not None and not writer._queue.full():
+        return record(instance)
+    # Saving, or waiting on a full queue, must not block the event loop
+    return await sync_to_async(record)(instance)
+
+
+def flush():
+    writer = get_writer()
+    if writer is not None:
+        writer.flush()
+
+
+def stats():
+    writer = get_writer()
+    return writer.stats() if writer is not None else {'enabled': False}
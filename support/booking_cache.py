@@ -0,0 +1,74 @@
+"""
+Cache of the serialized active-bookings list per PNR.
+
+Entries live in the Django cache named by BOOKINGS_CACHE_ALIAS (local memory by
+default, so any configured backend such as Redis or Memcached can be swapped
+in). They are invalidated by the Booking/CancelledBooking signals in
+support/signals.py and explicitly by the cancel path; BOOKINGS_CACHE_TTL is
+only a safety net.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import normalize_pnr
+
+_MISSING = object()
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _cache():
+    return caches[settings.BOOKINGS_CACHE_ALIAS]
+
+
+def _key(pnr):
+    return f'active-bookings:{normalize_pnr(pnr)}'
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get(pnr):
+    """Cached list of booking dicts, or None on a miss"""
+    data = _cache().get(_key(pnr), _MISSING)
+    if data is _MISSING:
+        _count('misses')
+        return None
+    _count('hits')
+    return data
+
+
+async def aget(pnr):
+    data = await _cache().aget(_key(pnr), _MISSING)
+    if data is _MISSING:
+        _count('misses')
+        return None
+    _count('hits')
+    return data
+
+
+def set(pnr, data):
+    _cache().set(_key(pnr), data, settings.BOOKINGS_CACHE_TTL)
+
+
+async def aset(pnr, data):
+    await _cache().aset(_key(pnr), data, settings.BOOKINGS_CACHE_TTL)
+
+
+def invalidate(pnr):
+    if not pnr:
+        return
+    _cache().delete(_key(pnr))
+    _count('invalidations')
+
+
+def stats():
+    with _lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses']
+    counters['hit_rate'] = (counters['hits'] / lookups) if lookups else 0.0
+    return counters
@@ -0,0 +1,112 @@
+"""
+Publish/subscribe for pushing booking and flight updates to open chat sockets.
+
+Subscribers are keyed by PNR. publish() may be called from any thread (model
+signals fire in sync worker threads under ASGI); events are handed to each
+subscriber's asyncio.Queue on that subscriber's own event loop.
+
+The default InProcessBroker only reaches sockets held by the same process.
+With several ASGI workers, register a shared implementation (e.g. Redis
+pub/sub) in BROKERS and select it with CHAT_BROKER.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+
+from .models import normalize_pnr
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._counters = {'published': 0, 'delivered': 0, 'dropped': 0}
+
+    def subscribe(self, pnr):
+        """Register the calling event loop for events on a PNR; returns the queue to read"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(normalize_pnr(pnr), []).append(entry)
+        return queue
+
+    def unsubscribe(self, pnr, queue):
+        key = normalize_pnr(pnr)
+        with self._lock:
+            entries = [e for e in self._subscribers.get(key, []) if e[1] is not queue]
+            if entries:
+                self._subscribers[key] = entries
+            else:
+                self._subscribers.pop(key, None)
+
+    def has_subscribers(self, pnr):
+        return normalize_pnr(pnr) in self._subscribers
+
+    def publish(self, pnr, event):
+        with self._lock:
+            entries = list(self._subscribers.get(normalize_pnr(pnr), ()))
+            self._counters['published'] += 1
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Loop already closed; the socket's cleanup will unsubscribe it
+                pass
+        return len(entries)
+
+    def _deliver(self, queue, event):
+        try:
+            queue.put_nowait(event)
+            key = 'delivered'
+        except asyncio.QueueFull:
+            # A client that stopped reading loses updates rather than growing memory
+            key = 'dropped'
+        with self._lock:
+            self._counters[key] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pnrs': len(self._subscribers),
+                'subscribers': sum(len(e) for e in self._subscribers.values()),
+                **self._counters,
+            }
+
+
+BROKERS = {
+    'inprocess': InProcessBroker,
+}
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                kind = getattr(settings, 'CHAT_BROKER', 'inprocess')
+                if kind not in BROKERS:
+                    raise ValueError(f"Unknown chat broker {kind!r}; choose from {sorted(BROKERS)}")
+                _broker = BROKERS[kind]()
+    return _broker
+
+
+def publish_booking_update(booking, event):
+    """Push a booking change ('created', 'updated', 'cancelled') to sockets on its PNR"""
+    broker = get_broker()
+    if not broker.has_subscribers(booking.pnr):
+        # Skip serializing on the (common) path where nobody is listening
+        return 0
+    from .serializers import BookingSerializer
+    return broker.publish(booking.pnr, {'type': 'booking_update', 'event': event, 'booking': BookingSerializer(booking).data})
+
+
+def publish_flight_status(flight_id, status, pnrs):
+    """Push a flight status change to sockets on every PNR booked on the flight"""
+    broker = get_broker()
+    event = {'type': 'flight_update', 'flight_id': flight_id, 'status': status}
+    return sum(broker.publish(pnr, event) for pnr in set(normalize_pnr(p) for p in pnrs))
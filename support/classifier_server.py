@@ -0,0 +1,227 @@
+"""
+Out-of-process intent classification over a Unix domain socket.
+
+One server process owns the model and every web worker on the host talks to
+it through a small pooled client, so torch and the weights are loaded once
+per host instead of once per worker.
+
+Wire format (all integers big-endian), each message framed as
+    uint32 length | body
+Request body:
+    uint8 op (0 = ping, 1 = classify) | float32 threshold | uint16 count |
+    count x (uint16 n | n bytes utf-8 query)
+Response body:
+    uint8 status (0 = ok, 1 = error) | uint16 count |
+    count x (uint16 n | n bytes utf-8 intent, n == 0 meaning None | float32 score)
+An error response carries a single utf-8 message after the status byte.
+
+The client cuts each query to MAX_QUERY_BYTES (the encoder only reads the
+first few hundred tokens anyway) and sends at most MAX_BATCH queries per
+request, so any input fits the uint16 fields and stays under MAX_FRAME.
+"""
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+
+OP_PING = 0
+OP_CLASSIFY = 1
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_LENGTH = struct.Struct('>I')
+_REQUEST_HEAD = struct.Struct('>BfH')
+_RESPONSE_HEAD = struct.Struct('>BH')
+_U16 = struct.Struct('>H')
+_SCORE = struct.Struct('>f')
+MAX_FRAME = 1 << 22
+MAX_QUERY_BYTES = 4096
+MAX_BATCH = 512
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError('classifier socket closed')
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _send_frame(sock, body):
+    sock.sendall(_LENGTH.pack(len(body)) + body)
+
+
+def _recv_frame(sock):
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    if length > MAX_FRAME:
+        raise ConnectionError(f'classifier frame too large ({length} bytes)')
+    return _recv_exact(sock, length)
+
+
+def _query_bytes(query):
+    data = query.encode('utf-8')
+    if len(data) > MAX_QUERY_BYTES:
+        # Cut on a character boundary so the server can still decode it
+        data = data[:MAX_QUERY_BYTES].decode('utf-8', 'ignore').encode('utf-8')
+    return data
+
+
+def encode_request(op, queries=(), threshold=0.5):
+    if len(queries) > MAX_BATCH:
+        raise ValueError(f'at most {MAX_BATCH} queries per request, got {len(queries)}')
+    parts = [_REQUEST_HEAD.pack(op, threshold, len(queries))]
+    for q in queries:
+        data = _query_bytes(q)
+        parts.append(_U16.pack(len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def decode_request(body):
+    op, threshold, count = _REQUEST_HEAD.unpack_from(body, 0)
+    offset = _REQUEST_HEAD.size
+    queries = []
+    for _ in range(count):
+        (n,) = _U16.unpack_from(body, offset)
+        offset += _U16.size
+        queries.append(body[offset:offset + n].decode('utf-8'))
+        offset += n
+    return op, threshold, queries
+
+
+def encode_response(results):
+    parts = [_RESPONSE_HEAD.pack(STATUS_OK, len(results))]
+    for intent, score in results:
+        data = intent.encode('utf-8') if intent else b''
+        parts.append(_U16.pack(len(data)))
+        parts.append(data)
+        parts.append(_SCORE.pack(score))
+    return b''.join(parts)
+
+
+def encode_error(message):
+    return bytes([STATUS_ERROR]) + message.encode('utf-8')
+
+
+def decode_response(body):
+    if body[0] == STATUS_ERROR:
+        raise RuntimeError(f"classifier server error: {body[1:].decode('utf-8', 'replace')}")
+    _, count = _RESPONSE_HEAD.unpack_from(body, 0)
+    offset = _RESPONSE_HEAD.size
+    results = []
+    for _ in range(count):
+        (n,) = _U16.unpack_from(body, offset)
+        offset += _U16.size
+        intent = body[offset:offset + n].decode('utf-8') or None
+        offset += n
+        (score,) = _SCORE.unpack_from(body, offset)
+        offset += _SCORE.size
+        results.append((intent, score))
+    return results
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        classifier = self.server.classifier
+        while True:
+            try:
+                body = _recv_frame(self.request)
+            except ConnectionError:
+                return
+            try:
+                op, threshold, queries = decode_request(body)
+                if op == OP_PING:
+                    reply = encode_response([])
+                elif op == OP_CLASSIFY:
+                    reply = encode_response(classifier.classify_batch(queries, threshold=threshold))
+                else:
+                    reply = encode_error(f'unknown op {op}')
+            except Exception as e:
+                reply = encode_error(str(e))
+            _send_frame(self.request, reply)
+
+
+class ClassifierServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, classifier):
+        self.classifier = classifier
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o660)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class ClassifierClient:
+    """
+    Thread-safe client keeping up to pool_size open connections to the server.
+    Any socket failure discards that connection and raises OSError/ConnectionError.
+    """
+
+    def __init__(self, path, pool_size=4, timeout=2.0):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _call(self, body):
+        try:
+            sock = self._pool.get_nowait()
+        except queue.Empty:
+            sock = self._connect()
+        try:
+            _send_frame(sock, body)
+            reply = _recv_frame(sock)
+        except (OSError, ConnectionError):
+            sock.close()
+            raise
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+        return decode_response(reply)
+
+    def ping(self):
+        try:
+            self._call(encode_request(OP_PING))
+            return True
+        except (OSError, ConnectionError, RuntimeError):
+            return False
+
+    def classify_batch(self, queries, threshold=0.5):
+        queries = list(queries)
+        results = []
+        for start in range(0, len(queries), MAX_BATCH):
+            results.extend(self._call(encode_request(OP_CLASSIFY, queries[start:start + MAX_BATCH], threshold)))
+        return results
+
+    def classify(self, query, threshold=0.5):
+        return self.classify_batch([query], threshold)[0]
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,38 @@
+"""
+Send booking reads to the read-only SQLite connection (DATABASES['readonly']).
+
+Only used by the production database profile. Both aliases point at the same
+WAL-mode file, so the read connection sees every committed write; inside a
+transaction on 'default' reads stay on 'default' so a view reads its own
+uncommitted writes (e.g. the cancel path).
+"""
+from django.db import connections
+
+from .models import Booking, CancelledBooking
+
+READ_ALIAS = 'readonly'
+WRITE_ALIAS = 'default'
+ROUTED_MODELS = (Booking, CancelledBooking)
+
+
+class ReadOnlyBookingRouter:
+    def db_for_read(self, model, **hints):
+        if not issubclass(model, ROUTED_MODELS):
+            return None
+        if connections[WRITE_ALIAS].in_atomic_block:
+            return WRITE_ALIAS
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return WRITE_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same database file under two aliases
+        if {obj1._state.db, obj2._state.db} <= {READ_ALIAS, WRITE_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == READ_ALIAS:
+            return False
+        return None
@@ -0,0 +1,115 @@
+"""
+Table-driven dispatch for the chat dialog in process_message.
+
+Handlers register for a (state, intent) pair; either side may be ANY. A turn
+is routed with at most four dict lookups, most specific first:
+    (state, intent) -> (state, ANY) -> (ANY, intent) -> (ANY, ANY)
+Every handler call is timed and counted so hot or slow branches show up in
+DialogEngine.stats().
+
+For the async chat view, a handler can have an async twin registered with
+async_version(); adispatch() awaits the twin when there is one and otherwise
+runs the sync handler in a worker thread.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+ANY = '*'
+
+
+class DialogContext:
+    """Everything a handler needs about one chat turn, parsed once from the request"""
+
+    def __init__(self, request, payload):
+        self.request = request
+        self.session = request.session
+        self.payload = payload
+        self.msg = str(payload.get('message') or '').lower()
+        self.state = self.session.get('state')
+        self.verified_pnr = self.session.get('verified_pnr')
+        # booking_id sent with this request (None if the client didn't send one)
+        self.payload_booking_id = payload.get('booking_id')
+        # booking this turn is about: from the request, else the one remembered in session
+        self.booking_id = self.payload_booking_id or self.session.get('selected_booking_id')
+        self.intent = None
+        self.confidence = None
+
+    @classmethod
+    async def abuild(cls, request, payload):
+        # Load the session through the async API so the reads below hit memory
+        await request.session.aget('state')
+        return cls(request, payload)
+
+
+class DialogEngine:
+    def __init__(self):
+        self._routes = {}
+        self._async_twins = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def route(self, states=ANY, intents=ANY):
+        """Decorator registering a handler for every (state, intent) combination given"""
+        states = states if isinstance(states, (list, tuple)) else [states]
+        intents = intents if isinstance(intents, (list, tuple)) else [intents]
+
+        def register(handler):
+            for state in states:
+                for intent in intents:
+                    if (state, intent) in self._routes:
+                        raise ValueError(f'Dialog route ({state}, {intent}) registered twice')
+                    self._routes[(state, intent)] = handler
+            return handler
+        return register
+
+    def async_version(self, handler):
+        """Decorator registering an async implementation of an existing handler"""
+        def register(async_handler):
+            self._async_twins[handler] = async_handler
+            return async_handler
+        return register
+
+    def resolve(self, state, intent):
+        routes = self._routes
+        return (routes.get((state, intent)) or routes.get((state, ANY))
+                or routes.get((ANY, intent)) or routes.get((ANY, ANY)))
+
+    def dispatch(self, ctx, state, intent):
+        handler = self.resolve(state, intent)
+        if handler is None:
+            raise LookupError(f'No dialog handler for ({state}, {intent})')
+        start = time.perf_counter()
+        try:
+            return handler(ctx)
+        finally:
+            self._record(handler.__name__, (time.perf_counter() - start) * 1000)
+
+    async def adispatch(self, ctx, state, intent):
+        handler = self.resolve(state, intent)
+        if handler is None:
+            raise LookupError(f'No dialog handler for ({state}, {intent})')
+        twin = self._async_twins.get(handler)
+        start = time.perf_counter()
+        try:
+            if twin is not None:
+                return await twin(ctx)
+            return await sync_to_async(handler)(ctx)
+        finally:
+            self._record(handler.__name__, (time.perf_counter() - start) * 1000)
+
+    def _record(self, name, elapsed_ms):
+        with self._lock:
+            entry = self._stats.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+
+    def stats(self):
+        """Per-handler call counts and timings, hottest first"""
+        with self._lock:
+            rows = {name: dict(entry) for name, entry in self._stats.items()}
+        for entry in rows.values():
+            entry['mean_ms'] = entry['total_ms'] / entry['calls']
+        return dict(sorted(rows.items(), key=lambda item: item[1]['total_ms'], reverse=True))
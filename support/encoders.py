@@ -0,0 +1,131 @@
+"""
+Sentence encoder backends for the intent classifier.
+
+Every backend exposes encode(texts) -> float32 (N, D) matrix of L2-normalized
+embeddings, so IntentClassifier doesn't care which one it is running on.
+Heavy dependencies are imported inside the backend that needs them.
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+def _hub_id(model_name):
+    # sentence-transformers resolves bare names under its own organisation
+    return model_name if '/' in model_name else f'sentence-transformers/{model_name}'
+
+
+class TorchEncoder:
+    """Eager PyTorch encoder via sentence-transformers (the original path)"""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.name = f'torch:{model_name}'
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts):
+        embeddings = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime encoder with dynamically int8-quantized weights.
+
+    The transformer is exported and quantized once into export_dir; later
+    processes only need onnxruntime and the tokenizer. Pooling matches the
+    sentence-transformers MiniLM pipeline: attention-masked mean, then L2 norm.
+    """
+    max_length = 128
+
+    def __init__(self, model_name, export_dir, quantize=True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.name = f"onnx{'-int8' if quantize else ''}:{model_name}"
+        export_dir = Path(export_dir) / model_name.replace('/', '__')
+        model_path = export_dir / ('model-int8.onnx' if quantize else 'model.onnx')
+        if not model_path.exists():
+            export_onnx(model_name, export_dir, quantize=quantize)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(export_dir))
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_path), options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        tokens = self.tokenizer(list(texts), padding=True, truncation=True,
+                                max_length=self.max_length, return_tensors='np')
+        feed = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+        hidden = self.session.run(None, feed)[0]
+        mask = tokens['attention_mask'][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def export_onnx(model_name, export_dir, quantize=True):
+    """Export the Hugging Face transformer to ONNX and optionally quantize it to int8"""
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    # Export into a private directory and rename the files into place, like the
+    # embedding artifact, so workers exporting at once never leave a partial model
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f'.export-{os.getpid()}-', dir=export_dir))
+    try:
+        _export_onnx(model_name, tmp_dir, quantize)
+        # The models go last: a worker takes an existing model file as a finished export
+        for name in sorted(os.listdir(tmp_dir), key=lambda n: (n.endswith('.onnx'), n)):
+            os.replace(tmp_dir / name, export_dir / name)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _export_onnx(model_name, export_dir, quantize):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    fp32_path = export_dir / 'model.onnx'
+
+    tokenizer = AutoTokenizer.from_pretrained(_hub_id(model_name))
+    model = AutoModel.from_pretrained(_hub_id(model_name))
+    model.eval()
+
+    sample = tokenizer(['export sample text'], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    tokenizer.save_pretrained(str(export_dir))
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(fp32_path), str(export_dir / 'model-int8.onnx'), weight_type=QuantType.QInt8)
+
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+def load_encoder(backend, model_name, export_dir=None):
+    """Build the encoder selected by INTENT_BACKEND"""
+    if backend == 'torch':
+        return TorchEncoder(model_name)
+    if backend in ('onnx', 'onnx-int8'):
+        if export_dir is None:
+            raise ValueError('ONNX backends need an export directory (INTENT_ARTIFACT_DIR)')
+        return OnnxEncoder(model_name, Path(export_dir) / 'onnx', quantize=(backend == 'onnx-int8'))
+    raise ValueError(f"Unknown intent backend {backend!r}; expected one of {', '.join(BACKENDS)}")
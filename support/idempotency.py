@@ -0,0 +1,84 @@
+"""
+Idempotency-Key support for unsafe API endpoints.
+
+A client that may retry (double clicks, timeouts) sends the same
+Idempotency-Key header with each attempt. The first attempt's response is
+stored in the same transaction as the view's own writes; later attempts with
+that key get the stored response back, marked with Idempotent-Replayed: true,
+without running the view again. Reusing a key for a different request body is
+rejected with 422. Requests without the header run as before.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def purge_expired():
+    """Delete stored responses past IDEMPOTENCY_KEY_TTL_HOURS; returns how many"""
+    deleted, _ = IdempotencyRecord.objects.filter(created_at__lt=_expiry_cutoff()).delete()
+    return deleted
+
+
+def _lookup(endpoint, key):
+    record = IdempotencyRecord.objects.filter(endpoint=endpoint, key=key).first()
+    if record is not None and record.created_at < _expiry_cutoff():
+        record.delete()
+        return None
+    return record
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return JsonResponse({'message': f'{HEADER} was already used for a different request'}, status=422)
+    response = JsonResponse(record.response, status=record.status_code, safe=False)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(endpoint):
+    """View decorator: honour the Idempotency-Key header for this endpoint"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return view(request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return JsonResponse({'message': f'{HEADER} longer than {MAX_KEY_LENGTH} characters'}, status=400)
+            request_hash = hashlib.sha256(request.body).hexdigest()
+            record = _lookup(endpoint, key)
+            if record is not None:
+                return _replay(record, request_hash)
+            try:
+                with transaction.atomic():
+                    response = view(request, *args, **kwargs)
+                    # Server errors aren't stored, so the client can retry them
+                    if response.status_code < 500 and response.get('Content-Type') == 'application/json':
+                        IdempotencyRecord.objects.create(
+                            endpoint=endpoint, key=key, request_hash=request_hash,
+                            status_code=response.status_code, response=json.loads(response.content),
+                        )
+            except IntegrityError:
+                # A concurrent attempt with the same key committed first; its writes stand
+                record = _lookup(endpoint, key)
+                if record is None:
+                    raise
+                return _replay(record, request_hash)
+            return response
+        return wrapper
+    return decorator
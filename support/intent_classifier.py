@@ -1,139 +1,691 @@
 """
 Intent Classifier using Sentence Transformers for fast semantic matching
 """
-try:
-    from sentence_transformers import SentenceTransformer, util
-    import torch
-    BERT_AVAILABLE = True
-except Exception as e:
-    print(f"BERT not available: {e}")
-    BERT_AVAILABLE = False
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .caching import LRUCache
+from .encoders import load_encoder
+from .intent_index import build_index
+
+def _module_installed(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return name in sys.modules
+
+
+# Only check that sentence-transformers is installed; torch and the model are
+# imported by the encoder on the first classification, so management commands,
+# migrations and admin requests don't pay for them.
+BERT_AVAILABLE = _module_installed('sentence_transformers')
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Bump when the on-disk embedding layout changes so old artifacts are ignored
+ARTIFACT_VERSION = 1
+
+# Intent examples - these are used for semantic matching
+INTENT_EXAMPLES = {
+    'booked_flights': [
+        'show my bookings',
+        'show my flights',
+        'booked flights',
+        'my bookings',
+        'all my flights',
+        'what flights do I have',
+        'show me my reservations',
+        'list my bookings'
+    ],
+    'cancel': [
+        'cancel my flight',
+        'cancel booking',
+        'cancel trip',
+        'I want to cancel',
+        'cancel my reservation',
+        'cancel this flight',
+        'delete booking'
+    ],
+    'status': [
+        'flight status',
+        'check status',
+        'status of my flight',
+        'is my flight on time',
+        'flight information',
+        'check my flight'
+    ],
+    'seat': [
+        'seat information',
+        'my seat',
+        'seat number',
+        'available seats',
+        'seat availability',
+        'what is my seat',
+        'change seat'
+    ],
+    'pets': [
+        'pet policy',
+        'can I bring my pet',
+        'pets allowed',
+        'travel with dog',
+        'bring my cat',
+        'pet travel',
+        'animal policy'
+    ]
+}
+
+
+# Keyword fallback, in priority order: when several intents match, the first wins
+INTENT_KEYWORDS = {
+    'booked_flights': ['booked', 'my bookings', 'show', 'flights', 'reservations'],
+    'cancel': ['cancel', 'delete', 'remove'],
+    'status': ['status', 'on time', 'delayed', 'check flight'],
+    'seat': ['seat', 'seats'],
+    'pets': ['pet', 'dog', 'cat', 'animal'],
+}
+# Other word forms the fast path accepts for a keyword; it only matches whole words
+KEYWORD_FORMS = {
+    'cancel': ['cancels', 'cancelled', 'canceled', 'cancelling', 'canceling', 'cancellation', 'cancellations'],
+    'reservations': ['reservation'],
+    'pet': ['pets'],
+    'dog': ['dogs'],
+    'cat': ['cats'],
+    'animal': ['animals'],
+}
+KEYWORD_SCORE = 0.8
+
+
+class KeywordMatcher:
+    """
+    All keywords compiled into one regex. The pattern is wrapped in a lookahead
+    so a single scan finds every keyword at every position, which keeps the
+    plain substring semantics of the old `any(k in q ...)` chains. The fast
+    path is stricter and only counts whole words (a keyword or one of its
+    forms), so 'catering' isn't about cats and 'shower' doesn't ask to show
+    bookings.
+    """
+
+    def __init__(self, keywords, forms=None):
+        self._priority = {intent: i for i, intent in enumerate(keywords)}
+        self._intent_for = {}
+        for intent, words in keywords.items():
+            for word in words:
+                self._intent_for.setdefault(word, intent)
+        self._word_intent_for = dict(self._intent_for)
+        for word, word_forms in (forms or {}).items():
+            for form in word_forms:
+                self._word_intent_for.setdefault(form, self._intent_for[word])
+        self._pattern = re.compile(f'(?=({self._alternation(self._intent_for)}))')
+        self._word_pattern = re.compile(rf'\b(?=({self._alternation(self._word_intent_for)})\b)')
+
+    @staticmethod
+    def _alternation(words):
+        return '|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+    def matches(self, query, whole_words=False):
+        """Set of intents with at least one keyword in the query"""
+        if whole_words:
+            return {self._word_intent_for[m.group(1)] for m in self._word_pattern.finditer(query.lower())}
+        return {self._intent_for[m.group(1)] for m in self._pattern.finditer(query.lower())}
+
+    def best(self, query):
+        """Highest-priority matching intent, or None"""
+        intents = self.matches(query)
+        return min(intents, key=self._priority.__getitem__) if intents else None
+
+    def unambiguous(self, query):
+        """The matching intent if exactly one intent matched as a whole word, else None"""
+        intents = self.matches(query, whole_words=True)
+        return next(iter(intents)) if len(intents) == 1 else None
+
+
+_keyword_matcher = KeywordMatcher(INTENT_KEYWORDS, KEYWORD_FORMS)
+
+
+def _setting(name, default):
+    """Read an optional Django setting, falling back when Django isn't configured"""
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so equivalent phrasings share a cache key"""
+    return re.sub(r'\s+', ' ', query.strip().lower())
+
+
+def artifact_key(model_name, intent_examples):
+    """Hash of the model and the examples; any change produces a new artifact"""
+    # Rows are laid out in intent order, so reordering the intents must change the key too
+    blob = json.dumps({'model': model_name, 'examples': list(intent_examples.items())})
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def _artifact_path(key):
+    artifact_dir = _setting('INTENT_ARTIFACT_DIR', None)
+    if not artifact_dir:
+        return None
+    return Path(artifact_dir) / f"intent-embeddings-v{ARTIFACT_VERSION}-{key}.npy"
+
+
+def _load_artifact(key, n_examples):
+    """Memory-map a previously saved example matrix, or None if missing/stale"""
+    path = _artifact_path(key)
+    if path is None or not path.exists():
+        return None
+    try:
+        matrix = np.load(path, mmap_mode='r')
+    except Exception as e:
+        print(f"Ignoring unreadable intent artifact {path}: {e}")
+        return None
+    if matrix.ndim != 2 or matrix.shape[0] != n_examples:
+        return None
+    return matrix
+
+
+def _save_artifact(key, matrix):
+    path = _artifact_path(key)
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so concurrent workers never read a partial file
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Could not write intent artifact {path}: {e}")
+
+
+class _PendingQuery:
+    __slots__ = ('query', 'threshold', 'result', 'error', 'done')
+
+    def __init__(self, query, threshold):
+        self.query = query
+        self.threshold = threshold
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-query classifications into one forward pass.
+
+    Callers block in submit(); a background thread takes the first waiting
+    query, keeps collecting for up to max_wait_ms or until max_batch_size
+    queries are queued, then runs them through batch_fn in one padded batch
+    and wakes each caller with its own result. A caller that waits longer than
+    timeout seconds classifies its query itself.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=3.0, timeout=2.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.queue_depths = Counter()
+        self.max_queue_depth = 0
+        self.timeouts = 0
+        self._ensure_started()
+
+    def _ensure_started(self):
+        # Per process, like the audit writer: a worker forked after warmup
+        # (gunicorn --preload) inherits this object but not its thread
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return True
+        with self._start_lock:
+            if self._closed:
+                return False
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    # Queries queued in the parent have no waiter here
+                    self._queue = queue.Queue()
+                    self._stats_lock = threading.Lock()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='intent-microbatch', daemon=True)
+                self._thread.start()
+        return True
+
+    def submit(self, query, threshold):
+        if not self._ensure_started():
+            return self.batch_fn([query], threshold)[0]
+        pending = _PendingQuery(query, threshold)
+        self._queue.put(pending)
+        if not pending.done.wait(self.timeout):
+            # The batch thread is stuck or far behind: don't hold the request on it
+            with self._stats_lock:
+                self.timeouts += 1
+            return self.batch_fn([query], threshold)[0]
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def close(self):
+        with self._start_lock:
+            self._closed = True
+            thread = self._thread if self._pid == os.getpid() else None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+    def _run(self, work_queue):
+        running = True
+        while running:
+            first = work_queue.get()
+            if first is None:
+                return
+            depth = work_queue.qsize() + 1
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = work_queue.get(timeout=remaining) if remaining > 0 else work_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            with self._stats_lock:
+                self.batch_sizes[len(batch)] += 1
+                self.queue_depths[depth] += 1
+                self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def _dispatch(self, batch):
+        # classify_batch takes one threshold, so group callers that used the same one
+        by_threshold = {}
+        for pending in batch:
+            by_threshold.setdefault(pending.threshold, []).append(pending)
+        for threshold, group in by_threshold.items():
+            try:
+                results = self.batch_fn([p.query for p in group], threshold)
+                for pending, result in zip(group, results):
+                    pending.result = result
+            except Exception as e:
+                for pending in group:
+                    pending.error = e
+            for pending in group:
+                pending.done.set()
+
+    def stats(self):
+        with self._stats_lock:
+            batches = sum(self.batch_sizes.values())
+            queries = sum(size * count for size, count in self.batch_sizes.items())
+            return {
+                'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+                'max_queue_depth': self.max_queue_depth,
+                'timeouts': self.timeouts,
+                'batches': batches,
+                'queries': queries,
+                'mean_batch_size': (queries / batches) if batches else 0.0,
+                'batch_size_histogram': dict(sorted(self.batch_sizes.items())),
+                'queue_depth_histogram': dict(sorted(self.queue_depths.items())),
+            }
+
 
 class IntentClassifier:
-    def __init__(self):
-        if not BERT_AVAILABLE:
+    def __init__(self, intent_examples=None, backend=None):
+        self.intent_examples = {k: list(v) for k, v in (intent_examples or INTENT_EXAMPLES).items()}
+        self.backend = backend or _setting('INTENT_BACKEND', 'torch')
+        self.batcher = None
+        # Which tier answered each query: cache, keyword, model or keyword_fallback
+        self.keyword_fast_path = _setting('INTENT_KEYWORD_FAST_PATH', True)
+        self.tier_counts = Counter()
+        self._tier_lock = threading.Lock()
+        # Cache of (normalized query, threshold) -> (intent, score)
+        self.cache = LRUCache(
+            maxsize=_setting('INTENT_CACHE_SIZE', 1024),
+            ttl=_setting('INTENT_CACHE_TTL', None),
+        )
+        if self.backend == 'torch' and not BERT_AVAILABLE:
             self.model = None
-            self.intent_embeddings = {}
+            self._reset_index()
+            print("BERT not available: sentence-transformers is not installed")
             print("Running in keyword-matching mode")
             return
-            
+
         # Use a small, fast model
-        print("Loading intent classification model...")
+        print(f"Loading intent classification model ({self.backend})...")
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = load_encoder(self.backend, MODEL_NAME, _setting('INTENT_ARTIFACT_DIR', None))
             print("Intent classification model loaded successfully!")
         except Exception as e:
             print(f"Failed to load BERT model: {e}")
             self.model = None
-            self.intent_embeddings = {}
+            self._reset_index()
             return
-        
-        # Define intent examples - these will be used for semantic matching
-        self.intent_examples = {
-            'booked_flights': [
-                'show my bookings',
-                'show my flights',
-                'booked flights',
-                'my bookings',
-                'all my flights',
-                'what flights do I have',
-                'show me my reservations',
-                'list my bookings'
-            ],
-            'cancel': [
-                'cancel my flight',
-                'cancel booking',
-                'cancel trip',
-                'I want to cancel',
-                'cancel my reservation',
-                'cancel this flight',
-                'delete booking'
-            ],
-            'status': [
-                'flight status',
-                'check status',
-                'status of my flight',
-                'is my flight on time',
-                'flight information',
-                'check my flight'
-            ],
-            'seat': [
-                'seat information',
-                'my seat',
-                'seat number',
-                'available seats',
-                'seat availability',
-                'what is my seat',
-                'change seat'
-            ],
-            'pets': [
-                'pet policy',
-                'can I bring my pet',
-                'pets allowed',
-                'travel with dog',
-                'bring my cat',
-                'pet travel',
-                'animal policy'
-            ]
-        }
-        
+
         # Pre-compute embeddings for all examples
-        self.intent_embeddings = {}
-        if self.model:
-            for intent, examples in self.intent_examples.items():
-                embeddings = self.model.encode(examples, convert_to_tensor=True)
-                self.intent_embeddings[intent] = embeddings
-    
+        self._build_index()
+
+        # Optionally coalesce concurrent cache misses from request threads
+        self.batcher = None
+        if _setting('INTENT_MICROBATCH', False):
+            self.batcher = MicroBatcher(
+                self._classify_uncached,
+                max_batch_size=_setting('INTENT_MICROBATCH_MAX_SIZE', 32),
+                max_wait_ms=_setting('INTENT_MICROBATCH_WINDOW_MS', 3.0),
+                timeout=_setting('INTENT_MICROBATCH_TIMEOUT', 2.0),
+            )
+
+    def set_intent_examples(self, intent_examples):
+        """Replace the intent examples, rebuild the index and drop stale cached results"""
+        self.intent_examples = {k: list(v) for k, v in intent_examples.items()}
+        if self.model is not None:
+            self._build_index()
+        self.cache.clear()
+
+    def _reset_index(self):
+        self.intent_names = []
+        self.example_matrix = None
+        self.example_intent_ids = None
+        self._intent_offsets = None
+        self.index = None
+
+    def _build_index(self):
+        """
+        Stack every example embedding into one L2-normalized (N, D) matrix.
+        Examples of the same intent are contiguous, so example_intent_ids maps
+        each row to its intent and _intent_offsets marks where each intent starts.
+        The matrix is memory-mapped from the on-disk artifact when one matches.
+        Scoring goes through the index selected by INTENT_INDEX.
+        """
+        self.intent_names = list(self.intent_examples.keys())
+        examples = []
+        intent_ids = []
+        for idx, intent in enumerate(self.intent_names):
+            examples.extend(self.intent_examples[intent])
+            intent_ids.extend([idx] * len(self.intent_examples[intent]))
+        # Quantized backends produce slightly different vectors, so key on the encoder too
+        key = artifact_key(self.model.name, self.intent_examples)
+        matrix = _load_artifact(key, len(examples))
+        if matrix is None:
+            matrix = self._encode(examples)
+            _save_artifact(key, matrix)
+        self.example_matrix = matrix
+        self.example_intent_ids = np.asarray(intent_ids, dtype=np.int64)
+        self._intent_offsets = np.flatnonzero(np.r_[True, np.diff(self.example_intent_ids) != 0])
+        self.index = build_index(
+            _setting('INTENT_INDEX', 'brute'),
+            self.example_matrix,
+            self.example_intent_ids,
+            len(self.intent_names),
+            top_k=_setting('INTENT_INDEX_TOP_K', 8),
+            nlist=_setting('INTENT_IVF_NLIST', None),
+            nprobe=_setting('INTENT_IVF_NPROBE', 8),
+        )
+
+    def _encode(self, texts):
+        """Encode a list of texts into a float32 (N, D) matrix of unit vectors"""
+        return self.model.encode(texts)
+
+    def _score(self, query_matrix):
+        """Score a (B, D) matrix of normalized queries against every intent: returns (B, n_intents)"""
+        return self.index.score(query_matrix)
+
     def classify(self, user_query, threshold=0.5):
         """
         Classify user query into an intent
         Returns: intent name or None if no match above threshold
         """
+        return self.classify_batch([user_query], threshold=threshold)[0]
+
+    def classify_batch(self, queries, threshold=0.5):
+        """
+        Classify several queries with a single encode and matmul
+        Returns: list of (intent, score) in the same order as queries
+        """
+        keys = [(normalize_query(q), threshold) for q in queries]
+        results = [self.cache.get(key) for key in keys]
+        misses = [i for i, r in enumerate(results) if r is None]
+        self._count_tier('cache', len(keys) - len(misses))
+        if not misses:
+            return results
+
+        if self.model is not None and self.keyword_fast_path:
+            # Tier 1: a query whose keywords all point at one intent skips the model
+            remaining = []
+            for i in misses:
+                intent = self._keyword_tier(keys[i][0], threshold)
+                if intent is None:
+                    remaining.append(i)
+                else:
+                    results[i] = (intent, KEYWORD_SCORE)
+            self._count_tier('keyword', len(misses) - len(remaining))
+            misses = remaining
+            if not misses:
+                return results
+
+        if self.batcher is not None and len(misses) == 1:
+            # A lone miss from a request thread joins whatever else is in flight
+            uncached = [self.batcher.submit(keys[misses[0]][0], threshold)]
+        else:
+            uncached = self._classify_uncached([keys[i][0] for i in misses], threshold)
+        for i, result in zip(misses, uncached):
+            results[i] = result
+            self.cache.set(keys[i], result)
+        return results
+
+    @staticmethod
+    def _keyword_tier(query, threshold):
+        """Fast-path intent for a normalized query, or None to ask the model"""
+        # The shortcut answers with KEYWORD_SCORE, which must clear the threshold like a model score would
+        if KEYWORD_SCORE <= threshold:
+            return None
+        return _keyword_matcher.unambiguous(query)
+
+    def _classify_uncached(self, queries, threshold):
         # Fallback to keyword matching if BERT not available
         if self.model is None:
-            return self._keyword_classify(user_query), 0.8
-        
-        query_embedding = self.model.encode(user_query, convert_to_tensor=True)
-        
-        best_intent = None
-        best_score = threshold
-        
-        for intent, example_embeddings in self.intent_embeddings.items():
-            # Calculate cosine similarity with all examples
-            similarities = util.cos_sim(query_embedding, example_embeddings)[0]
-            max_similarity = torch.max(similarities).item()
-            
-            if max_similarity > best_score:
-                best_score = max_similarity
-                best_intent = intent
-        
-        return best_intent, best_score
-    
-    def _keyword_classify(self, query):
+            self._count_tier('keyword_fallback', len(queries))
+            return [(self._keyword_classify(q), KEYWORD_SCORE) for q in queries]
+
+        self._count_tier('model', len(queries))
+        intent_scores = self._score(self._encode(list(queries)))
+        best_ids = intent_scores.argmax(axis=1)
+        best_scores = intent_scores[np.arange(len(queries)), best_ids]
+
+        results = []
+        for idx, score in zip(best_ids, best_scores):
+            if score > threshold:
+                results.append((self.intent_names[idx], float(score)))
+            else:
+                results.append((None, threshold))
+        return results
+
+    def _count_tier(self, tier, n):
+        if n:
+            with self._tier_lock:
+                self.tier_counts[tier] += n
+
+    def tier_stats(self):
+        with self._tier_lock:
+            counts = dict(self.tier_counts)
+        total = sum(counts.values())
+        answered_without_model = total - counts.get('model', 0)
+        return {
+            'counts': counts,
+            'total': total,
+            'model_skip_rate': (answered_without_model / total) if total else 0.0,
+        }
+
+    @staticmethod
+    def _keyword_classify(query):
         """Fallback keyword-based classification"""
-        q = query.lower()
-        if any(k in q for k in ['booked', 'my bookings', 'show', 'flights', 'reservations']):
-            return 'booked_flights'
-        if any(k in q for k in ['cancel', 'delete', 'remove']):
-            return 'cancel'
-        if any(k in q for k in ['status', 'on time', 'delayed', 'check flight']):
-            return 'status'
-        if any(k in q for k in ['seat', 'seats']):
-            return 'seat'
-        if any(k in q for k in ['pet', 'dog', 'cat', 'animal']):
-            return 'pets'
-        return None
+        return _keyword_matcher.best(query)
 
-# Global instance (loaded once)
+# Global instance (loaded once per process, guarded so concurrent callers load it once)
 _classifier = None
+_classifier_lock = threading.Lock()
+
+
+def _reset_classifier_lock():
+    # A fork while a background warmup holds the lock would copy it into the
+    # child locked, with no thread left to release it; the child starts clean
+    global _classifier_lock
+    _classifier_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_classifier_lock)
+
+
+def get_classifier():
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier()
+    return _classifier
+
+
+# Client for the shared classifier process, used when INTENT_SERVER_SOCKET is set
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    path = _setting('INTENT_SERVER_SOCKET', None)
+    if not path:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from .classifier_server import ClassifierClient
+                _client = ClassifierClient(
+                    str(path),
+                    pool_size=_setting('INTENT_SERVER_POOL_SIZE', 4),
+                    timeout=_setting('INTENT_SERVER_TIMEOUT', 2.0),
+                )
+    return _client
+
+
+def warmup(background=False):
+    """Load the classifier ahead of the first chat message"""
+    if get_client() is not None:
+        # The model lives in the classifier server process
+        return None
+    if background:
+        thread = threading.Thread(target=get_classifier, name='intent-warmup', daemon=True)
+        thread.start()
+        return thread
+    return get_classifier()
+
+
+def is_ready():
+    client = get_client()
+    if client is not None:
+        return client.ping()
+    return _classifier is not None
+
+
+def classifier_mode():
+    """'server', 'bert' or 'keyword' - which path get_intent is answering from"""
+    if get_client() is not None:
+        return 'server'
+    if _classifier is None or _classifier.model is None:
+        return 'keyword'
+    return 'bert'
+
 
 def get_intent(query):
     """
     Get intent from user query
     Returns: (intent, confidence_score)
     """
-    global _classifier
+    client = get_client()
+    if client is not None:
+        try:
+            return client.classify(query.lower())
+        except (OSError, ConnectionError, RuntimeError) as e:
+            print(f"Classifier server unavailable, using keywords: {e}")
+            return IntentClassifier._keyword_classify(query.lower()), KEYWORD_SCORE
+    return get_classifier().classify(query.lower())
+
+
+# Async views run classification here so a slow encode never blocks the event loop;
+# the pool size bounds how many classifications run at once per process
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_setting('INTENT_EXECUTOR_WORKERS', 4),
+                    thread_name_prefix='intent',
+                )
+    return _executor
+
+
+async def aget_intent(query):
+    """Async get_intent: classifies on the bounded executor, off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), get_intent, query)
+
+
+def get_intents(queries):
+    """
+    Batch version of get_intent
+    Returns: list of (intent, confidence_score)
+    """
+    queries = [q.lower() for q in queries]
+    client = get_client()
+    if client is not None:
+        try:
+            return client.classify_batch(queries)
+        except (OSError, ConnectionError, RuntimeError) as e:
+            print(f"Classifier server unavailable, using keywords: {e}")
+            return [(IntentClassifier._keyword_classify(q), KEYWORD_SCORE) for q in queries]
+    return get_classifier().classify_batch(queries)
+
+
+def get_cache_stats():
+    """Hit/miss/eviction counters of the classification cache (None before first use)"""
     if _classifier is None:
-        _classifier = IntentClassifier()
-    
-    return _classifier.classify(query.lower())
+        return None
+    return _classifier.cache.stats()
+
+
+def get_batch_stats():
+    """Queue depth and batch-size histograms of the micro-batcher (None when disabled)"""
+    if _classifier is None or _classifier.batcher is None:
+        return None
+    return _classifier.batcher.stats()
+
+
+def get_tier_stats():
+    """How many queries each cascade tier answered (None before first use)"""
+    if _classifier is None:
+        return None
+    return _classifier.tier_stats()
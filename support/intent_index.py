@@ -0,0 +1,157 @@
+"""
+Nearest-neighbour indexes over the intent example embeddings.
+
+Each index is built from an (N, D) matrix of unit vectors whose rows are grouped
+by intent (intent_ids non-decreasing) and answers score(queries) with a
+(B, n_intents) matrix: the best cosine similarity of each query to an example
+of each intent. Intents with no examples, and intents an approximate index
+didn't visit, score -inf, which is fine for classification since only the
+best intent is used.
+
+- BruteForceIndex: one matmul against every example (exact, the default)
+- CentroidIndex:   coarse pass over per-intent centroids, then exact rescoring
+                   against the examples of the top_k intents only
+- IVFIndex:        spherical k-means cells over the examples; each query scans
+                   the examples in its nprobe closest cells to pick candidate
+                   intents, which are then rescored exactly like CentroidIndex
+
+Because candidates are always rescored against all of their examples, the
+best intent's score equals the brute-force score whenever the index finds it.
+"""
+import numpy as np
+
+
+def _segment_offsets(intent_ids, n_intents):
+    """Row where each intent starts, plus N at the end"""
+    return np.searchsorted(intent_ids, np.arange(n_intents + 1))
+
+
+def _reduce_segments(ufunc, values, offsets, axis, empty):
+    """
+    ufunc.reduceat over each intent's rows along axis. reduceat can't express an
+    empty segment (it returns the next row instead, or fails past the end), so
+    it only sees the intents that have rows and the others are set to empty.
+    """
+    nonempty = offsets[:-1] < offsets[1:]
+    shape = list(values.shape)
+    shape[axis] = len(nonempty)
+    out = np.full(shape, empty, dtype=values.dtype)
+    if nonempty.any():
+        index = [slice(None)] * values.ndim
+        index[axis] = nonempty
+        out[tuple(index)] = ufunc.reduceat(values, offsets[:-1][nonempty], axis=axis)
+    return out
+
+
+class BruteForceIndex:
+    def __init__(self, matrix, intent_ids, n_intents):
+        self.matrix = matrix
+        self.offsets = _segment_offsets(intent_ids, n_intents)
+
+    def score(self, queries):
+        similarities = queries @ self.matrix.T
+        return _reduce_segments(np.maximum, similarities, self.offsets, axis=1, empty=-np.inf)
+
+
+class _RescoringIndex:
+    """Shared exact rescoring of a few candidate intents per query"""
+
+    def __init__(self, matrix, intent_ids, n_intents, top_k):
+        self.matrix = matrix
+        self.intent_ids = np.asarray(intent_ids)
+        self.n_intents = n_intents
+        self.top_k = min(top_k, n_intents)
+        self.offsets = _segment_offsets(self.intent_ids, n_intents)
+
+    def _top_intents(self, approx):
+        if self.top_k >= self.n_intents:
+            return np.tile(np.arange(self.n_intents), (len(approx), 1))
+        return np.argpartition(-approx, self.top_k - 1, axis=1)[:, :self.top_k]
+
+    def _rescore(self, queries, candidates):
+        out = np.full((len(queries), self.n_intents), -np.inf, dtype=np.float32)
+        for b, intents in enumerate(candidates):
+            starts, ends = self.offsets[intents], self.offsets[intents + 1]
+            keep = ends > starts
+            intents, starts, ends = intents[keep], starts[keep], ends[keep]
+            if not len(intents):
+                continue
+            rows = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+            similarities = self.matrix[rows] @ queries[b]
+            segment_starts = np.concatenate(([0], np.cumsum(ends - starts)[:-1]))
+            out[b, intents] = np.maximum.reduceat(similarities, segment_starts)
+        return out
+
+
+class CentroidIndex(_RescoringIndex):
+    def __init__(self, matrix, intent_ids, n_intents, top_k=8):
+        super().__init__(matrix, intent_ids, n_intents, top_k)
+        sums = _reduce_segments(np.add, np.asarray(matrix, dtype=np.float32), self.offsets, axis=0, empty=0.0)
+        self.centroids = sums / np.clip(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12, None)
+        self.empty = self.offsets[:-1] == self.offsets[1:]
+
+    def score(self, queries):
+        approx = queries @ self.centroids.T
+        approx[:, self.empty] = -np.inf  # an intent with no examples is never a candidate
+        return self._rescore(queries, self._top_intents(approx))
+
+
+class IVFIndex(_RescoringIndex):
+    def __init__(self, matrix, intent_ids, n_intents, top_k=8, nlist=None, nprobe=8, iterations=10, seed=0):
+        super().__init__(matrix, intent_ids, n_intents, top_k)
+        n = len(matrix)
+        self.nlist = min(nlist or max(1, int(np.sqrt(n))), n)
+        self.nprobe = min(nprobe, self.nlist)
+
+        self.cells = self._kmeans(np.asarray(matrix, dtype=np.float32), iterations, seed)
+        assignment = self._assign(matrix)
+        self.order = np.argsort(assignment, kind='stable')
+        self.cell_offsets = np.searchsorted(assignment[self.order], np.arange(self.nlist + 1))
+
+    def _assign(self, matrix, chunk=16384):
+        return np.concatenate([
+            (matrix[i:i + chunk] @ self.cells.T).argmax(axis=1) for i in range(0, len(matrix), chunk)
+        ])
+
+    def _kmeans(self, matrix, iterations, seed):
+        rng = np.random.default_rng(seed)
+        self.cells = matrix[rng.choice(len(matrix), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = self._assign(matrix)
+            sums = np.zeros_like(self.cells)
+            np.add.at(sums, assignment, matrix)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            sums[empty] = self.cells[empty]
+            self.cells = sums / np.where(empty[:, None], 1.0, norms)
+        return self.cells
+
+    def score(self, queries):
+        coarse = queries @ self.cells.T
+        if self.nprobe >= self.nlist:
+            probes = np.tile(np.arange(self.nlist), (len(queries), 1))
+        else:
+            probes = np.argpartition(-coarse, self.nprobe - 1, axis=1)[:, :self.nprobe]
+
+        # Approximate per-intent scores from the probed cells pick the candidates
+        approx = np.full((len(queries), self.n_intents), -np.inf, dtype=np.float32)
+        for b, cells in enumerate(probes):
+            rows = np.concatenate([
+                self.order[self.cell_offsets[c]:self.cell_offsets[c + 1]] for c in cells
+            ])
+            np.maximum.at(approx[b], self.intent_ids[rows], self.matrix[rows] @ queries[b])
+        return self._rescore(queries, self._top_intents(approx))
+
+
+INDEXES = ('brute', 'centroid', 'ivf')
+
+
+def build_index(kind, matrix, intent_ids, n_intents, **options):
+    if kind == 'brute':
+        return BruteForceIndex(matrix, intent_ids, n_intents)
+    if kind == 'centroid':
+        return CentroidIndex(matrix, intent_ids, n_intents, top_k=options.get('top_k', 8))
+    if kind == 'ivf':
+        return IVFIndex(matrix, intent_ids, n_intents, top_k=options.get('top_k', 8),
+                        nlist=options.get('nlist'), nprobe=options.get('nprobe', 8))
+    raise ValueError(f"Unknown intent index {kind!r}; expected one of {', '.join(INDEXES)}")
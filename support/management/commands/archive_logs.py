@@ -0,0 +1,83 @@
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.dateparse import parse_date, parse_datetime
+
+from support.idempotency import purge_expired
+from support.retention import ARCHIVED_MODELS, archive, archive_root, read_archive
+
+
+def _parse_when(value):
+    if value is None:
+        return None
+    parsed = parse_datetime(value) or parse_date(value)
+    if parsed is None:
+        raise CommandError(f'Not a date or datetime: {value}')
+    return parsed
+
+
+class Command(BaseCommand):
+    help = ('Move old Message/ProcessLog rows into gzip JSONL day archives (run from cron), '
+            'or query the archives with --read')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(ARCHIVED_MODELS), action='append',
+                            help='Table(s) to archive (default: all)')
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help='Override RETENTION_DAYS for every selected table')
+        parser.add_argument('--max-rows', type=int, default=None,
+                            help='Override RETENTION_MAX_ROWS for every selected table')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--dir', default=None, help='Archive root (defaults to RETENTION_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move')
+        parser.add_argument('--vacuum', action='store_true', help='VACUUM the SQLite database afterwards')
+        parser.add_argument('--read', action='store_true',
+                            help='Print archived rows as JSONL instead of archiving (one --model)')
+        parser.add_argument('--start', help='With --read: date or datetime (inclusive)')
+        parser.add_argument('--end', help='With --read: date (inclusive) or datetime (exclusive)')
+        parser.add_argument('--pnr', help='With --read: only rows for this PNR')
+
+    def handle(self, *args, **options):
+        models = options['model'] or sorted(ARCHIVED_MODELS)
+        if options['read']:
+            if len(models) != 1:
+                raise CommandError('--read needs exactly one --model')
+            for row in read_archive(models[0], _parse_when(options['start']), _parse_when(options['end']),
+                                    options['pnr'], options['dir']):
+                self.stdout.write(json.dumps(row))
+            return
+
+        retention_days = getattr(settings, 'RETENTION_DAYS', {})
+        max_rows = getattr(settings, 'RETENTION_MAX_ROWS', {})
+        for model_key in models:
+            days = options['older_than_days'] if options['older_than_days'] is not None else retention_days.get(model_key)
+            cap = options['max_rows'] if options['max_rows'] is not None else max_rows.get(model_key)
+            if days is None and cap is None:
+                self.stdout.write(f'{model_key}: no retention configured, skipped')
+                continue
+            start = time.perf_counter()
+            result = archive(model_key, older_than=timedelta(days=days) if days is not None else None,
+                             max_rows=cap, chunk_size=options['chunk_size'], root=options['dir'],
+                             dry_run=options['dry_run'])
+            elapsed = time.perf_counter() - start
+            if options['dry_run']:
+                self.stdout.write(f"{model_key}: {result['rows']} rows would be archived")
+            else:
+                self.stdout.write(f"{model_key}: archived {result['rows']} rows in {result['chunks']} chunks, "
+                                  f"{len(result['files'])} files under {archive_root(options['dir'])} "
+                                  f"({elapsed:.1f}s)")
+
+        if not options['dry_run'] and not options['model']:
+            self.stdout.write(f'idempotency keys: purged {purge_expired()} expired')
+
+        if options['vacuum'] and not options['dry_run']:
+            if connection.vendor != 'sqlite':
+                self.stderr.write('--vacuum only applies to SQLite; skipped')
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute('VACUUM')
+                self.stdout.write('VACUUM done')
@@ -0,0 +1,174 @@
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from support.caching import LRUCache
+from support.intent_classifier import IntentClassifier, normalize_query
+
+NO_INTENT = 'none'
+
+
+def _load_corpus(path):
+    """JSONL rows of {"text": ..., "intent": ...}; intent null/"none" marks out-of-scope"""
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                rows.append((row['text'], row.get('intent') or NO_INTENT))
+            except (ValueError, KeyError) as e:
+                raise CommandError(f'{path}:{line_no}: expected {{"text", "intent"}} ({e})')
+    if not rows:
+        raise CommandError(f'{path} has no utterances')
+    return rows
+
+
+def _percentiles(timings_ms):
+    return {f'p{p}': float(np.percentile(timings_ms, p)) for p in (50, 95, 99)}
+
+
+def _label(intent, score, threshold):
+    return intent if intent is not None and score > threshold else NO_INTENT
+
+
+def _predict(fast_path, text, model_result, threshold):
+    """The label classify_batch(threshold=threshold) would give: keyword tier first, then the model"""
+    intent = IntentClassifier._keyword_tier(text, threshold) if fast_path else None
+    return intent if intent is not None else _label(*model_result, threshold)
+
+
+class Command(BaseCommand):
+    help = 'Offline accuracy and latency evaluation of IntentClassifier on a labeled JSONL corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('corpus', help='JSONL file with {"text": ..., "intent": ...} per line')
+        parser.add_argument('--threshold', type=float, default=0.5)
+        parser.add_argument('--batch-size', type=int, default=32)
+        parser.add_argument('--repeat', type=int, default=1, help='Passes over the corpus for timing')
+        parser.add_argument('--use-cache', action='store_true',
+                            help='Keep the query cache on (off by default so every query is encoded)')
+        parser.add_argument('--no-keyword-tier', action='store_true',
+                            help='Send every query to the model, skipping the keyword fast path')
+        parser.add_argument('--json', dest='json_path', help='Also write the full report as JSON here')
+
+    def handle(self, *args, **options):
+        rows = _load_corpus(options['corpus'])
+        texts = [normalize_query(text) for text, _ in rows]
+        gold = [label for _, label in rows]
+        threshold = options['threshold']
+
+        classifier = IntentClassifier()
+        if not options['use_cache']:
+            classifier.cache = LRUCache(maxsize=0)
+        if options['no_keyword_tier']:
+            classifier.keyword_fast_path = False
+
+        # Warm up so one-time costs (lazy imports, first forward pass) don't skew latency
+        classifier.classify_batch(texts[:options['batch_size']], threshold=-1.0)
+
+        # Single-shot: one query per call, like the /process view
+        single_ms = []
+        raw = []
+        for _ in range(options['repeat']):
+            raw = []
+            for text in texts:
+                start = time.perf_counter()
+                raw.append(classifier.classify_batch([text], threshold=-1.0)[0])
+                single_ms.append((time.perf_counter() - start) * 1000)
+
+        # Batched: the whole corpus in batch_size chunks
+        batch_ms = []
+        batch_total = 0.0
+        size = options['batch_size']
+        for _ in range(options['repeat']):
+            for i in range(0, len(texts), size):
+                start = time.perf_counter()
+                classifier.classify_batch(texts[i:i + size], threshold=-1.0)
+                elapsed = time.perf_counter() - start
+                batch_ms.append(elapsed * 1000)
+                batch_total += elapsed
+
+        tiers = classifier.tier_stats()
+        # The timed passes use threshold -1, where the keyword tier answers every query it can with
+        # KEYWORD_SCORE. Production skips that tier at thresholds >= KEYWORD_SCORE and asks the model,
+        # so the labels below are rebuilt per threshold from the model's own scores
+        fast_path = classifier.model is not None and classifier.keyword_fast_path
+        if fast_path:
+            model_results = []
+            for i in range(0, len(texts), size):
+                model_results.extend(classifier._classify_uncached(texts[i:i + size], -1.0))
+        else:
+            model_results = raw
+
+        predicted = [_predict(fast_path, text, result, threshold) for text, result in zip(texts, model_results)]
+        labels = sorted(set(gold) | set(predicted))
+        confusion = {g: {p: 0 for p in labels} for g in labels}
+        for g, p in zip(gold, predicted):
+            confusion[g][p] += 1
+
+        sweep = []
+        for t in np.round(np.arange(0.0, 1.0, 0.05), 2):
+            preds = [_predict(fast_path, text, result, t) for text, result in zip(texts, model_results)]
+            answered = [(g, p) for g, p in zip(gold, preds) if p != NO_INTENT]
+            sweep.append({
+                'threshold': float(t),
+                'accuracy': sum(g == p for g, p in zip(gold, preds)) / len(gold),
+                'coverage': len(answered) / len(gold),
+                'precision': (sum(g == p for g, p in answered) / len(answered)) if answered else 0.0,
+            })
+
+        n_single = len(single_ms)
+        report = {
+            'corpus': options['corpus'],
+            'utterances': len(rows),
+            'mode': 'keyword' if classifier.model is None else classifier.model.name,
+            'threshold': threshold,
+            'accuracy': sum(g == p for g, p in zip(gold, predicted)) / len(gold),
+            'confusion': confusion,
+            'threshold_sweep': sweep,
+            'single': {
+                'latency_ms': _percentiles(single_ms),
+                'throughput_qps': n_single / (sum(single_ms) / 1000) if single_ms else 0.0,
+            },
+            'batched': {
+                'batch_size': size,
+                'batch_latency_ms': _percentiles(batch_ms),
+                'throughput_qps': (len(texts) * options['repeat']) / batch_total if batch_total else 0.0,
+            },
+            'tiers': tiers,
+        }
+
+        self._print_report(report, labels)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"\nWrote {options['json_path']}")
+
+    def _print_report(self, report, labels):
+        out = self.stdout.write
+        out(f"{report['utterances']} utterances, encoder {report['mode']}")
+        out(f"Accuracy @ {report['threshold']:.2f}: {report['accuracy']:.1%}")
+
+        width = max(len(label) for label in labels) + 2
+        out('\nConfusion (rows = expected, columns = predicted)')
+        out(' ' * width + ''.join(f'{label[:10]:>11}' for label in labels))
+        for g in labels:
+            out(f'{g:<{width}}' + ''.join(f'{report["confusion"][g][p]:>11}' for p in labels))
+
+        out('\nThreshold  accuracy  coverage  precision')
+        for row in report['threshold_sweep']:
+            out(f"{row['threshold']:>9.2f}  {row['accuracy']:>8.1%}  {row['coverage']:>8.1%}  {row['precision']:>9.1%}")
+
+        single, batched = report['single'], report['batched']
+        out('\nLatency')
+        out('  single   p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms'.format(**single['latency_ms'])
+            + f"  {single['throughput_qps']:.0f} q/s")
+        out(f"  batch/{batched['batch_size']:<3}"
+            + 'p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms'.format(**batched['batch_latency_ms'])
+            + f"  {batched['throughput_qps']:.0f} q/s")
+        out(f"\nTiers: {report['tiers']['counts']}")
@@ -0,0 +1,279 @@
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from support import booking_cache
+from support.models import Booking, normalize_pnr
+from support.serializers import CreateBookingSerializer
+
+REQUIRED_TEXT = ('pnr', 'source_airport_code', 'destination_airport_code')
+UPDATE_FIELDS = ('source_airport_code', 'destination_airport_code', 'scheduled_arrival', 'assigned_seat')
+# Keep IN (...) lists under SQLite's default host-parameter limit
+LOOKUP_CHUNK = 900
+UPDATE_BATCH = 200
+
+
+def _read_rows(path, fmt):
+    """
+    Yield (line number, row dict) one input row at a time; CSV empty cells become None.
+    The line number is the file's, so CSV rows count the header (a row whose
+    quoted cells span lines is numbered by its last line).
+    """
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {k: (v if v != '' else None) for k, v in row.items()}
+        else:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    yield line_no, None
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = {'__error__': f'invalid JSON ({e})'}
+                yield line_no, row if isinstance(row, dict) else {'__error__': 'expected an object'}
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _aware(value):
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def _fast_validate(row):
+    """
+    The common case of CreateBookingSerializer validation without building a
+    serializer per row. Returns None for anything it isn't sure about, so the
+    caller can fall back to the serializer (and its error messages).
+    """
+    data = {}
+    for field in REQUIRED_TEXT:
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        data[field] = value.strip()
+    flight_id = row.get('flight_id')
+    if isinstance(flight_id, bool) or not isinstance(flight_id, (int, str)):
+        return None
+    try:
+        data['flight_id'] = int(flight_id)
+    except ValueError:
+        return None
+    for field in ('scheduled_departure', 'scheduled_arrival'):
+        value = row.get(field)
+        try:
+            parsed = parse_datetime(value) if isinstance(value, str) else None
+        except ValueError:
+            return None
+        if parsed is None:
+            return None
+        data[field] = _aware(parsed)
+    seat = row.get('assigned_seat')
+    if seat is not None:
+        if not isinstance(seat, str) or not seat.strip():
+            return None
+        seat = seat.strip()
+    data['assigned_seat'] = seat
+    return data
+
+
+def validate_row(row):
+    """(data, None) for a valid row, (None, errors) otherwise; same rules as CreateBookingSerializer"""
+    if '__error__' in row:
+        return None, {'non_field_errors': [row['__error__']]}
+    data = _fast_validate(row)
+    if data is not None:
+        return data, None
+    ser = CreateBookingSerializer(data=row)
+    if not ser.is_valid():
+        return None, ser.errors
+    data = dict(ser.validated_data)
+    data.setdefault('assigned_seat', None)
+    return data, None
+
+
+def _booking_key(data):
+    return (data['pnr'], data['flight_id'], data['scheduled_departure'])
+
+
+class Checkpoint:
+    """Rows of one input file already committed, kept in a small JSON file next to it"""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        self.fingerprint = None
+        if source != '-':
+            st = os.stat(source)
+            self.fingerprint = {'path': os.path.abspath(source), 'size': st.st_size, 'mtime': int(st.st_mtime)}
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('source') != self.fingerprint:
+            raise CommandError(f'{self.path} belongs to a different input; remove it or pass --restart')
+        return state['rows_done']
+
+    def save(self, rows_done, totals):
+        if not self.path:
+            return
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'source': self.fingerprint, 'rows_done': rows_done, 'totals': totals}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Command(BaseCommand):
+    help = 'Stream bookings from a CSV or JSONL manifest into the database in batched upserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file ('-' for stdin)")
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Input format (defaults to the file extension)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--on-conflict', choices=('update', 'skip'), default='update',
+                            help='What to do with a row whose (pnr, flight_id, scheduled_departure) already exists')
+        parser.add_argument('--checkpoint', help='Resume file; defaults to <path>.checkpoint.json')
+        parser.add_argument('--no-checkpoint', action='store_true')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+        parser.add_argument('--errors', dest='errors_path', help='Write rejected rows as JSONL here')
+        parser.add_argument('--max-errors', type=int, default=None,
+                            help='Abort after this many invalid rows (default: no limit)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        checkpoint_path = None
+        if path != '-' and not options['no_checkpoint']:
+            checkpoint_path = options['checkpoint'] or f'{path}.checkpoint.json'
+        checkpoint = Checkpoint(checkpoint_path, path)
+        if options['restart']:
+            checkpoint.clear()
+        rows_done = checkpoint.load()
+
+        self.totals = {'read': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'invalid': 0}
+        self.errors_file = open(options['errors_path'], 'a', encoding='utf-8') if options['errors_path'] else None
+        self.max_errors = options['max_errors']
+        self.on_conflict = options['on_conflict']
+
+        rows = _read_rows(path, fmt)
+        if rows_done:
+            # Skipping is just reading: already-committed rows aren't validated again
+            for _ in islice(rows, rows_done):
+                pass
+            self.stdout.write(f'Resuming after row {rows_done} from {checkpoint_path}')
+
+        start = time.perf_counter()
+        last_report = start
+        try:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch)
+                rows_done += len(batch)
+                checkpoint.save(rows_done, self.totals)
+                now = time.perf_counter()
+                if now - last_report >= 5:
+                    self._report(now - start, rows_done, final=False)
+                    last_report = now
+        finally:
+            if self.errors_file:
+                self.errors_file.close()
+
+        checkpoint.clear()
+        self._report(time.perf_counter() - start, rows_done, final=True)
+
+    def _import_batch(self, batch):
+        valid = {}
+        for line_no, row in batch:
+            if row is None:
+                continue
+            self.totals['read'] += 1
+            data, errors = validate_row(row)
+            if errors:
+                self._reject(line_no, row, errors)
+                continue
+            data['pnr'] = normalize_pnr(data['pnr'])
+            # A key repeated within the batch: the last row wins
+            valid[_booking_key(data)] = data
+        if not valid:
+            return
+
+        pnrs = sorted({key[0] for key in valid})
+        with transaction.atomic():
+            existing = {}
+            for i in range(0, len(pnrs), LOOKUP_CHUNK):
+                qs = (Booking.objects.filter(pnr__in=pnrs[i:i + LOOKUP_CHUNK])
+                      .only('id', 'pnr', 'flight_id', 'scheduled_departure', *UPDATE_FIELDS))
+                for booking in qs:
+                    existing.setdefault((booking.pnr, booking.flight_id, booking.scheduled_departure), booking)
+
+            to_create, to_update = [], []
+            for key, data in valid.items():
+                booking = existing.get(key)
+                if booking is None:
+                    to_create.append(Booking(**data))
+                elif self.on_conflict == 'skip':
+                    self.totals['skipped'] += 1
+                elif all(getattr(booking, field) == data[field] for field in UPDATE_FIELDS):
+                    # Re-imports of an unchanged manifest cost a read, not a write
+                    self.totals['unchanged'] += 1
+                else:
+                    for field in UPDATE_FIELDS:
+                        setattr(booking, field, data[field])
+                    to_update.append(booking)
+            # bulk_create/bulk_update skip save() and signals: pnr is normalized above and
+            # the bookings cache is invalidated once per PNR after commit
+            Booking.objects.bulk_create(to_create)
+            if to_update:
+                # bulk_update builds one CASE WHEN per field; small batches keep that fast
+                Booking.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=UPDATE_BATCH)
+            transaction.on_commit(lambda: [booking_cache.invalidate(pnr) for pnr in pnrs])
+        self.totals['created'] += len(to_create)
+        self.totals['updated'] += len(to_update)
+
+    def _reject(self, line_no, row, errors):
+        self.totals['invalid'] += 1
+        if self.errors_file:
+            self.errors_file.write(json.dumps({'line': line_no, 'errors': errors, 'data': row}, default=str) + '\n')
+        elif self.totals['invalid'] <= 10:
+            self.stderr.write(f'line {line_no}: {json.dumps(errors, default=str)}')
+        if self.max_errors is not None and self.totals['invalid'] > self.max_errors:
+            raise CommandError(f'More than {self.max_errors} invalid rows; stopped at line {line_no} '
+                               '(committed batches are kept; rerun to resume)')
+
+    def _report(self, elapsed, rows_done, final):
+        t = self.totals
+        rate = t['read'] / elapsed if elapsed else 0.0
+        line = (f"{'Imported' if final else 'Progress:'} {t['read']} rows in {elapsed:.1f}s ({rate:,.0f} rows/s): "
+                f"{t['created']} created, {t['updated']} updated, {t['unchanged']} unchanged, {t['skipped']} skipped, "
+                f"{t['invalid']} invalid")
+        if not final:
+            line += f' [row {rows_done}]'
+        self.stdout.write(line)
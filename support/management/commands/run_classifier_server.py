@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from support.classifier_server import ClassifierServer
+from support.intent_classifier import IntentClassifier
+
+
+class Command(BaseCommand):
+    help = 'Serve intent classification to all web workers on this host over a Unix socket'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None,
+                            help='Socket path (defaults to INTENT_SERVER_SOCKET)')
+
+    def handle(self, *args, **options):
+        path = options['socket'] or settings.INTENT_SERVER_SOCKET
+        if not path:
+            self.stderr.write('No socket path: pass --socket or set INTENT_SERVER_SOCKET')
+            return
+        classifier = IntentClassifier()
+        server = ClassifierServer(str(path), classifier)
+        self.stdout.write(f'Intent classifier listening on {path}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:35
+
+from django.db import migrations, models
+from django.db.models.functions import Trim, Upper
+
+
+def normalize_pnrs(apps, schema_editor):
+    # One UPDATE per table; only rows not already in canonical form are touched
+    for model_name in ('Booking', 'Message', 'ProcessLog'):
+        model = apps.get_model('support', model_name)
+        canonical = Upper(Trim('pnr'))
+        (model.objects.filter(pnr__isnull=False)
+            .annotate(canonical=canonical).exclude(pnr=models.F('canonical'))
+            .update(pnr=canonical))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0003_processlog'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_pnrs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='pnr',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='session_key',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['pnr', 'current_status'], name='booking_pnr_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['session_key', 'created_at'], name='message_session_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processlog',
+            index=models.Index(fields=['pnr', 'created_at'], name='processlog_pnr_created_idx'),
+        ),
+    ]
@@ -1,8 +1,14 @@
 from django.db import models
 
 
+def normalize_pnr(pnr):
+    """Canonical stored form of a PNR: trimmed and upper-case, so lookups can use plain equality"""
+    return (pnr or '').strip().upper()
+
+
 class Booking(models.Model):
-    pnr = models.CharField(max_length=20, db_index=True)
+    # Stored normalized (see save()); indexed via (pnr, current_status) below
+    pnr = models.CharField(max_length=20)
     flight_id = models.IntegerField()
     source_airport_code = models.CharField(max_length=10)
     destination_airport_code = models.CharField(max_length=10)
@@ -12,6 +18,18 @@ class Booking(models.Model):
     current_status = models.CharField(max_length=50, default='Scheduled')
     booked_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Lookups by PNR, nearly always with current_status != 'Cancelled'
+            models.Index(fields=['pnr', 'current_status'], name='booking_pnr_status_idx'),
+            # Keyset pages of a PNR's bookings in (scheduled_departure, id) order
+            models.Index(fields=['pnr', 'scheduled_departure'], name='booking_pnr_departure_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.pnr = normalize_pnr(self.pnr)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.pnr} - {self.flight_id} ({self.assigned_seat})"
 
@@ -30,11 +48,22 @@ class CancelledBooking(models.Model):
 class Message(models.Model):
     # store all incoming/outgoing messages and metadata
     pnr = models.CharField(max_length=20, null=True, blank=True, db_index=True)
-    session_key = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+    session_key = models.CharField(max_length=100, null=True, blank=True)
     sender = models.CharField(max_length=10, choices=(('user','user'),('bot','bot')))
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # A session's conversation in order
+            models.Index(fields=['session_key', 'created_at'], name='message_session_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pnr:
+            self.pnr = normalize_pnr(self.pnr)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.created_at} {self.sender}: {self.text[:40]}"
 
@@ -54,5 +83,35 @@ class ProcessLog(models.Model):
     result = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Audit trail for a PNR in order
+            models.Index(fields=['pnr', 'created_at'], name='processlog_pnr_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pnr:
+            self.pnr = normalize_pnr(self.pnr)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.created_at} {self.action} {self.pnr or ''}"
+
+
+class IdempotencyRecord(models.Model):
+    """Stored response for a request sent with an Idempotency-Key header (see support/idempotency.py)"""
+    endpoint = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    # Hash of the request body, so a key reused for a different request is rejected
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'key'], name='idempotency_endpoint_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.key} -> {self.status_code}"
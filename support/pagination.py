@@ -0,0 +1,175 @@
+"""
+Keyset pagination and streamed JSON arrays for the booking listings
+(/api/bookings, /api/cancelled_bookings, /api/flight/booking).
+
+Without paging parameters those endpoints return the whole list as before.
+With ?limit=N (and ?cursor=... from the previous page) they return
+
+    {"results": [...], "next_cursor": "..." | null}
+
+ordered by (scheduled_departure, id). The cursor encodes the last row's key,
+and the next page is fetched with WHERE (departure, id) > (cursor) instead of
+an OFFSET. Every page therefore costs the same, and rows added or cancelled
+between requests don't shift later pages.
+
+With ?stream=1 every matching row (after ?cursor, if given) is sent as one
+plain JSON array. The rows are read with .iterator(chunk_size=...), so memory
+stays flat however many segments a group PNR has.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def encode_cursor(departure, row_id):
+    raw = json.dumps([departure.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        departure, row_id = json.loads(raw)
+        departure = parse_datetime(departure)
+        row_id = int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidPageRequest('Invalid cursor')
+    if departure is None:
+        raise InvalidPageRequest('Invalid cursor')
+    return departure, row_id
+
+
+class PageRequest:
+    """Paging parameters of a listing request: limit, cursor and stream"""
+
+    def __init__(self, limit=None, cursor=None, stream=False):
+        self.limit = limit
+        self.cursor = cursor
+        self.stream = stream
+
+    @property
+    def paginated(self):
+        return self.limit is not None or self.cursor is not None
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.GET
+        stream = params.get('stream', '') in ('1', 'true')
+        cursor = params.get('cursor') or None
+        limit = params.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise InvalidPageRequest('limit must be an integer')
+            if limit < 1:
+                raise InvalidPageRequest('limit must be positive')
+            limit = min(limit, _setting('LISTING_MAX_PAGE_SIZE', 500))
+        elif cursor is not None and not stream:
+            limit = _setting('LISTING_PAGE_SIZE', 50)
+        if cursor is not None:
+            decode_cursor(cursor)  # reject a bad cursor before running any query
+        return cls(limit=limit, cursor=cursor, stream=stream)
+
+
+# Sort keys, as (departure field, id field) lookups from the listed model.
+# Cancellations sort by their booking's key, so both walk booking_pnr_departure_idx
+BOOKING_KEY = ('scheduled_departure', 'id')
+CANCELLATION_KEY = ('booking__scheduled_departure', 'booking__id')
+
+
+def _key_value(row, field):
+    for part in field.split('__'):
+        row = getattr(row, part)
+    return row
+
+
+def keyset(queryset, key, cursor=None):
+    """The queryset in key order, starting after the cursor"""
+    departure_field, id_field = key
+    queryset = queryset.order_by(departure_field, id_field)
+    if cursor:
+        departure, row_id = decode_cursor(cursor)
+        # The redundant >= lets SQLite seek the index to the cursor instead of
+        # walking the PNR's rows from the start
+        queryset = queryset.filter(**{f'{departure_field}__gte': departure}).filter(
+            Q(**{f'{departure_field}__gt': departure}) | Q(**{f'{id_field}__gt': row_id})
+        )
+    return queryset
+
+
+def _page(rows, key, limit):
+    # One row past the limit tells us whether there is a next page
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(*(_key_value(last, field) for field in key))
+
+
+def keyset_page(queryset, key, limit, cursor=None):
+    """(rows, next_cursor) for one page; next_cursor is None on the last page"""
+    rows = list(keyset(queryset, key, cursor)[:limit + 1])
+    return _page(rows, key, limit)
+
+
+async def akeyset_page(queryset, key, limit, cursor=None):
+    rows = [row async for row in keyset(queryset, key, cursor)[:limit + 1]]
+    return _page(rows, key, limit)
+
+
+def stream_chunk_size():
+    return _setting('LISTING_STREAM_CHUNK_SIZE', 500)
+
+
+def _encode(serializer_class, rows):
+    # One serializer per chunk: DRF copies its fields per instance, which costs more than the rows
+    return ','.join(json.dumps(item, cls=DjangoJSONEncoder) for item in serializer_class(rows, many=True).data)
+
+
+def json_array_chunks(rows, serializer_class, first=None):
+    """Encode an iterator of rows as a JSON array, one chunk per stream_chunk_size() rows"""
+    size = stream_chunk_size()
+    batch = [first] if first is not None else []
+    sep = ''
+    yield '['
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield sep + _encode(serializer_class, batch)
+            batch, sep = [], ','
+    if batch:
+        yield sep + _encode(serializer_class, batch)
+    yield ']'
+
+
+async def ajson_array_chunks(rows, serializer_class, first=None):
+    size = stream_chunk_size()
+    batch = [first] if first is not None else []
+    sep = ''
+    yield '['
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield sep + _encode(serializer_class, batch)
+            batch, sep = [], ','
+    if batch:
+        yield sep + _encode(serializer_class, batch)
+    yield ']'
+
+
+def json_stream_response(chunks):
+    return StreamingHttpResponse(chunks, content_type='application/json')
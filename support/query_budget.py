@@ -0,0 +1,183 @@
+"""
+Per-request database query accounting and N+1 detection.
+
+Every connection gets an execute wrapper (installed on connection_created, so
+the read-only alias and the threads behind the async ORM are covered too). It
+hands each query to the QueryCollector of the current context, a ContextVar
+that sync_to_async carries into worker threads. Queries from the audit writer
+thread aren't made inside any request, so they aren't counted.
+
+QueryBudgetMiddleware opens one collector per request. It counts queries and
+total DB time and flags N+1 suspects: the same SQL shape run
+QUERY_REPEAT_THRESHOLD or more times in one request. The totals feed
+/api/metrics. With QUERY_BUDGET_HEADERS on (DEBUG by default) they are also
+sent as X-DB-Queries / X-DB-Time-Ms / X-DB-Repeated-Queries headers and the
+suspects are printed.
+
+max_queries() is the same accounting as a context manager for checks and
+benchmarks (see tools/check_query_budgets.py):
+
+    with max_queries(3, 'api_get_booking_by_id'):
+        client.get('/api/bookings/1')
+
+Queries issued while a StreamingHttpResponse body is sent run after the
+middleware has returned and are not in its totals.
+"""
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_current = ContextVar('query_collector', default=None)
+
+# Collapse IN (%s, %s, ...) lists so they don't split one shape into many
+_IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def sql_shape(sql):
+    return _IN_LIST.sub('(%s, ...)', sql)
+
+
+class QueryCollector:
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.count = 0
+        self.time_ms = 0.0
+        self.shapes = {}
+        self._lock = threading.Lock()  # async views can run ORM calls on more than one thread
+
+    def record(self, sql, elapsed_ms):
+        shape = sql_shape(sql)
+        with self._lock:
+            self.count += 1
+            self.time_ms += elapsed_ms
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if self.parent is not None:
+            self.parent.record(sql, elapsed_ms)
+
+    def repeated(self, threshold=None):
+        """{sql shape: times run} for shapes run at least threshold times (N+1 suspects)"""
+        threshold = threshold or _setting('QUERY_REPEAT_THRESHOLD', 3)
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+
+def _execute(execute, sql, params, many, context):
+    collector = _current.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.record(sql, (time.perf_counter() - start) * 1000)
+
+
+def _install(connection):
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+@receiver(connection_created)
+def install_query_wrapper(sender, connection, **kwargs):
+    _install(connection)
+
+
+@contextmanager
+def collect_queries():
+    """Count the queries run in this context (nested collectors all see them)"""
+    # Connections opened before this module was imported missed connection_created
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+    collector = QueryCollector(parent=_current.get())
+    token = _current.set(collector)
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def max_queries(budget, label=''):
+    """Fail with QueryBudgetExceeded if the block runs more than budget queries"""
+    with collect_queries() as collector:
+        yield collector
+    if collector.count > budget:
+        shapes = '\n'.join(f'  {n}x {shape}' for shape, n in sorted(collector.shapes.items(), key=lambda kv: -kv[1]))
+        raise QueryBudgetExceeded(f'{label or "block"}: {collector.count} queries, budget {budget}\n{shapes}')
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _record_request(name, collector, suspects):
+    with _stats_lock:
+        entry = _stats.setdefault(name, {'requests': 0, 'queries': 0, 'max_queries': 0,
+                                         'db_ms': 0.0, 'repeated_query_requests': 0})
+        entry['requests'] += 1
+        entry['queries'] += collector.count
+        entry['max_queries'] = max(entry['max_queries'], collector.count)
+        entry['db_ms'] += collector.time_ms
+        entry['repeated_query_requests'] += bool(suspects)
+
+
+def stats():
+    """Per-view query counts and DB time, most queries per request first"""
+    with _stats_lock:
+        rows = {name: dict(entry) for name, entry in _stats.items()}
+    for entry in rows.values():
+        entry['mean_queries'] = entry['queries'] / entry['requests']
+        entry['mean_db_ms'] = entry['db_ms'] / entry['requests']
+    return dict(sorted(rows.items(), key=lambda kv: -kv[1]['mean_queries']))
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.headers = _setting('QUERY_BUDGET_HEADERS', settings.DEBUG)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_queries() as collector:
+            response = self.get_response(request)
+        return self._finish(request, response, collector)
+
+    async def __acall__(self, request):
+        with collect_queries() as collector:
+            response = await self.get_response(request)
+        return self._finish(request, response, collector)
+
+    def _finish(self, request, response, collector):
+        match = getattr(request, 'resolver_match', None)
+        name = (match.url_name or match.view_name) if match else 'unresolved'
+        suspects = collector.repeated()
+        _record_request(name, collector, suspects)
+        if self.headers:
+            response['X-DB-Queries'] = str(collector.count)
+            response['X-DB-Time-Ms'] = f'{collector.time_ms:.2f}'
+            if suspects:
+                response['X-DB-Repeated-Queries'] = str(len(suspects))
+                for shape, n in suspects.items():
+                    print(f'Possible N+1 in {request.method} {request.path} ({name}): {n}x {shape}')
+        return response
@@ -0,0 +1,242 @@
+"""
+Retention for the audit tables (Message, ProcessLog).
+
+archive() moves rows older than a cutoff, and optionally the oldest rows over
+a size cap, out of the live table into gzip JSONL files partitioned by day:
+
+    RETENTION_ARCHIVE_DIR/<model>/<YYYY>/<MM>/<YYYY-MM-DD>.<first id>.jsonl.gz
+
+Each chunk's rows for a day go to their own part file, named after the first
+row id. The part is written to a temp file, fsynced and renamed into place,
+and only then are the rows deleted from the table in the same transaction
+that read them. A crash leaves either no part or a complete one, never a
+damaged day. A crash after the rename leaves the rows in both places; the
+next run archives them again and read_archive() drops the duplicate ids, so
+archival is at-least-once on disk and exactly-once for readers.
+
+Older archives appended every chunk to one <YYYY-MM-DD>.jsonl.gz as a new
+gzip member. read_archive() still reads them, and keeps the rows before a
+member cut short by a crash.
+
+Next to each day's parts, <YYYY-MM-DD>.pnrs.json lists the PNRs they hold so
+PNR lookups only open the days that mention the PNR.
+"""
+import gzip
+import json
+import os
+import zlib
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Message, ProcessLog, normalize_pnr
+
+ARCHIVED_MODELS = {
+    'message': Message,
+    'processlog': ProcessLog,
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def archive_root(root=None):
+    return Path(root or _setting('RETENTION_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'var' / 'archive'))
+
+
+def _model(model_key):
+    try:
+        return ARCHIVED_MODELS[model_key]
+    except KeyError:
+        raise ValueError(f"Unknown archive {model_key!r}; choose from {sorted(ARCHIVED_MODELS)}")
+
+
+def day_path(root, model_key, day):
+    return Path(root) / model_key / f'{day:%Y}' / f'{day:%m}' / f'{day:%Y-%m-%d}.jsonl.gz'
+
+
+def part_path(root, model_key, day, first_id):
+    path = day_path(root, model_key, day)
+    return path.with_name(f'{day:%Y-%m-%d}.{first_id:012d}.jsonl.gz')
+
+
+def _pnr_index_path(path):
+    return path.with_name(path.name.replace('.jsonl.gz', '.pnrs.json'))
+
+
+def _read_pnr_index(path):
+    try:
+        with open(_pnr_index_path(path), encoding='utf-8') as f:
+            return set(json.load(f))
+    except FileNotFoundError:
+        return set()
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_day(root, model_key, day, rows):
+    """Write one chunk's rows for a day as a new part file; returns its path"""
+    path = part_path(root, model_key, day, rows[0]['id'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Temp file and rename: the rows are deleted once this returns, so the part must be whole
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as gz:
+                for row in rows:
+                    gz.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        _fsync_dir(path.parent)
+    _index_pnrs(day_path(root, model_key, day), rows)
+    return path
+
+
+def _index_pnrs(path, rows):
+    pnrs = {row['pnr'] for row in rows if row.get('pnr')}
+    if pnrs:
+        known = _read_pnr_index(path)
+        if not pnrs <= known:
+            index_path = _pnr_index_path(path)
+            tmp = index_path.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(sorted(known | pnrs), f)
+            os.replace(tmp, index_path)
+
+
+def _expired(model, older_than, max_rows, now):
+    """Filter for rows due for archival: older than the cutoff, or beyond the newest max_rows"""
+    cond = Q(created_at__lt=now - older_than) if older_than is not None else Q(pk__in=[])
+    if max_rows is not None:
+        over = model.objects.count() - max_rows
+        if over > 0:
+            boundary = model.objects.order_by('id').values_list('id', flat=True)[over]
+            cond |= Q(id__lt=boundary)
+    return cond
+
+
+def archive(model_key, older_than=None, max_rows=None, chunk_size=5000, root=None, now=None, dry_run=False):
+    """
+    Move expired rows of one audit table into the day-partitioned archive.
+    Returns counts: rows archived, chunks, and the day files touched.
+    """
+    model = _model(model_key)
+    root = archive_root(root)
+    now = now or timezone.now()
+    cond = _expired(model, older_than, max_rows, now)
+    fields = [f.attname for f in model._meta.concrete_fields]
+    result = {'model': model_key, 'rows': 0, 'chunks': 0, 'files': set()}
+    if dry_run:
+        result['rows'] = model.objects.filter(cond).count()
+        return result
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(model.objects.filter(cond, id__gt=last_id).order_by('id').values(*fields)[:chunk_size])
+            if not chunk:
+                break
+            by_day = {}
+            for row in chunk:
+                created = (row['created_at'] or now).astimezone(dt_timezone.utc)
+                by_day.setdefault(created.date(), []).append(row)
+            for day, rows in sorted(by_day.items()):
+                result['files'].add(str(_write_day(root, model_key, day, rows)))
+            first_id, last_id = chunk[0]['id'], chunk[-1]['id']
+            # Rows are read in id order, so the range plus the same filter is exactly this chunk
+            model.objects.filter(cond, id__gte=first_id, id__lte=last_id).delete()
+        result['rows'] += len(chunk)
+        result['chunks'] += 1
+    result['files'] = sorted(result['files'])
+    return result
+
+
+def _as_utc_datetime(value, end=False):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime.combine(value + timedelta(days=1) if end else value, time.min)
+    else:
+        raise TypeError(f'Expected a date or datetime, got {value!r}')
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, dt_timezone.utc)
+    return dt.astimezone(dt_timezone.utc)
+
+
+def _day_files(root, model_key, start, end):
+    """(day, [part files]) for each archived day overlapping start..end, oldest first"""
+    base = Path(root) / model_key
+    if not base.exists():
+        return
+    by_day = {}
+    for path in base.glob('*/*/*.jsonl.gz'):
+        by_day.setdefault(date.fromisoformat(path.name[:10]), []).append(path)
+    for day, paths in sorted(by_day.items()):
+        if start is not None and day < start.date():
+            continue
+        if end is not None and datetime.combine(day, time.min, dt_timezone.utc) >= end:
+            continue
+        yield day, sorted(paths)
+
+
+def _read_lines(path):
+    """Lines of a gzip JSONL file, stopping at a trailing member cut short by a crash"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # the last row of a truncated member
+                yield line
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        print(f'Archive {path} ends in a damaged gzip member ({e}); reading the rows before it')
+
+
+def read_archive(model_key, start=None, end=None, pnr=None, root=None):
+    """
+    Yield archived rows (dicts, oldest first) with start <= created_at < end and,
+    if given, the PNR. start/end may be dates (end date inclusive) or datetimes.
+    Only the day files overlapping the range, and listing the PNR, are opened.
+    """
+    _model(model_key)
+    start, end = _as_utc_datetime(start), _as_utc_datetime(end, end=True)
+    pnr = normalize_pnr(pnr) if pnr else None
+    root = archive_root(root)
+    for day, paths in _day_files(root, model_key, start, end):
+        if pnr is not None and pnr not in _read_pnr_index(day_path(root, model_key, day)):
+            continue
+        seen = set()
+        rows = []
+        for path in paths:
+            for line in _read_lines(path):
+                row = json.loads(line)
+                if row['id'] in seen:
+                    continue
+                seen.add(row['id'])
+                if pnr is not None and row.get('pnr') != pnr:
+                    continue
+                created = parse_datetime(row['created_at']) if row.get('created_at') else None
+                if created is not None and ((start and created < start) or (end and created >= end)):
+                    continue
+                rows.append(row)
+        rows.sort(key=lambda r: r['id'])
+        yield from rows
@@ -0,0 +1,204 @@
+"""
+Booking operations shared by the HTTP API views and the chat dialog.
+
+These work on model instances and plain Python values; serialization to JSON
+happens only at the edge, in the views.
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from . import audit, booking_cache, broker
+from .models import Booking, CancelledBooking, ProcessLog, normalize_pnr
+from .serializers import BookingSerializer, CancelledBookingSerializer
+
+
+class BookingNotFound(Exception):
+    pass
+
+
+def bookings_query(pnr):
+    return Booking.objects.filter(pnr=normalize_pnr(pnr))
+
+
+def active_bookings_query(pnr):
+    return bookings_query(pnr).exclude(current_status='Cancelled')
+
+
+def cancellations_query(pnr):
+    # The serializer nests the booking, so fetch it in the same query
+    return CancelledBooking.objects.filter(booking__pnr=normalize_pnr(pnr)).select_related('booking')
+
+
+def find_bookings(pnr):
+    """All bookings for a PNR, cancelled ones included"""
+    return list(bookings_query(pnr))
+
+
+def find_booking(pnr):
+    """First booking for a PNR, or None"""
+    return Booking.objects.filter(pnr=normalize_pnr(pnr)).first()
+
+
+def active_bookings(pnr):
+    """Bookings for a PNR that haven't been cancelled"""
+    return list(active_bookings_query(pnr))
+
+
+def pnr_exists(pnr):
+    return Booking.objects.filter(pnr=normalize_pnr(pnr)).exists()
+
+
+def cancelled_bookings(pnr):
+    """Cancellation records for a PNR"""
+    return list(cancellations_query(pnr))
+
+
+def active_bookings_data(pnr):
+    """
+    Serialized active bookings for a PNR, served from the per-PNR cache.
+    Only the first call after a change to the PNR's bookings hits the database.
+    """
+    data = booking_cache.get(pnr)
+    if data is None:
+        data = [dict(row) for row in BookingSerializer(active_bookings(pnr), many=True).data]
+        booking_cache.set(pnr, data)
+    return data
+
+
+def get_booking(booking_id):
+    """Booking by id, or None"""
+    try:
+        return Booking.objects.get(id=booking_id)
+    except (Booking.DoesNotExist, ValueError, TypeError):
+        return None
+
+
+# Async read paths for the ASGI views, using Django's async ORM API
+
+async def afind_bookings(pnr):
+    return [b async for b in bookings_query(pnr)]
+
+
+async def afind_booking(pnr):
+    return await Booking.objects.filter(pnr=normalize_pnr(pnr)).afirst()
+
+
+async def apnr_exists(pnr):
+    return await Booking.objects.filter(pnr=normalize_pnr(pnr)).aexists()
+
+
+async def acancelled_bookings(pnr):
+    return [c async for c in cancellations_query(pnr)]
+
+
+async def aget_booking(booking_id):
+    try:
+        return await Booking.objects.aget(id=booking_id)
+    except (Booking.DoesNotExist, ValueError, TypeError):
+        return None
+
+
+async def aactive_bookings_data(pnr):
+    data = await booking_cache.aget(pnr)
+    if data is None:
+        bookings = [b async for b in active_bookings_query(pnr)]
+        data = [dict(row) for row in BookingSerializer(bookings, many=True).data]
+        await booking_cache.aset(pnr, data)
+    return data
+
+
+def notify_flight_status(flight_id, status):
+    """Push a flight status change to the open chat sockets of every PNR booked on the flight"""
+    qs = Booking.objects.filter(flight_id=flight_id).exclude(current_status='Cancelled')
+    return broker.publish_flight_status(flight_id, status, qs.values_list('pnr', flat=True).distinct())
+
+
+def mock_booking(pnr):
+    if pnr.lower() == 'notfound':
+        return None
+    now = datetime.utcnow()
+    return {
+        'pnr': pnr,
+        'flight_id': 1234,
+        'source_airport_code': 'JFK',
+        'destination_airport_code': 'LAX',
+        'scheduled_departure': (now + timedelta(days=1)).isoformat() + 'Z',
+        'scheduled_arrival': (now + timedelta(days=1, hours=6)).isoformat() + 'Z',
+        'assigned_seat': '12A',
+        'current_departure': (now + timedelta(days=1)).isoformat() + 'Z',
+        'current_arrival': (now + timedelta(days=1, hours=6)).isoformat() + 'Z',
+        'current_status': 'Scheduled',
+    }
+
+
+def available_seats(pnr):
+    """Open seats on the PNR's flight, or None if the flight isn't found"""
+    if pnr == 'notfound':
+        return None
+    seats = []
+    for r in range(20, 26):
+        seats.append({
+            'row_number': r,
+            'column_letter': 'A',
+            'price': 99.0 + r,
+            'class': 'Economy',
+        })
+    return seats
+
+
+def _log_cancel(booking, payload, result):
+    # After commit, so a rolled-back cancel leaves no audit row
+    def log():
+        try:
+            audit.record(ProcessLog(action='cancel', booking=booking, pnr=booking.pnr, payload=payload, result=result))
+        except Exception:
+            pass
+    transaction.on_commit(log)
+
+
+def cancel_booking(booking_id, cancellation_charges=50.0, refund_amount=0.0, refund_date=None, payload=None):
+    """
+    Cancel a booking, keeping the row with current_status 'Cancelled'.
+    Returns (CancelledBooking, created); created is False if it was already cancelled.
+    Raises BookingNotFound for an unknown id.
+
+    One transaction, opened by a conditional UPDATE of current_status: that
+    takes the row (on SQLite, database) write lock before anything is read,
+    so of two concurrent cancels exactly one sees the UPDATE match and creates
+    the CancelledBooking; the other waits, then returns the stored one.
+    Three queries for a first cancel, two for a repeat.
+    """
+    if payload is None:
+        payload = {'booking_id': booking_id}
+    if isinstance(refund_date, str):
+        refund_date = parse_datetime(refund_date)
+    try:
+        booking_id = int(booking_id)
+    except (TypeError, ValueError):
+        raise BookingNotFound(booking_id)
+
+    with transaction.atomic():
+        claimed = (Booking.objects.filter(id=booking_id).exclude(current_status='Cancelled')
+                   .update(current_status='Cancelled'))
+        if not claimed:
+            existing = CancelledBooking.objects.select_related('booking').filter(booking_id=booking_id).first()
+            if existing:
+                _log_cancel(existing.booking, payload, {'status': 'exists'})
+                return existing, False
+        # Read inside the transaction, so it already carries the new status
+        booking = get_booking(booking_id)
+        if booking is None:
+            raise BookingNotFound(booking_id)
+        # Reached without claiming only for a booking marked Cancelled without a
+        # cancellation record; give it one
+        cancelled = CancelledBooking.objects.create(
+            booking=booking,
+            cancellation_charges=cancellation_charges,
+            refund_amount=refund_amount,
+            refund_date=refund_date or (datetime.utcnow() + timedelta(days=5)),
+        )
+        transaction.on_commit(lambda: booking_cache.invalidate(booking.pnr))
+        _log_cancel(booking, payload, CancelledBookingSerializer(cancelled).data)
+    return cancelled, True
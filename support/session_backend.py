@@ -0,0 +1,141 @@
+"""
+Session engine tuned for the chat widget.
+
+Reads go through a cache tier (SESSION_CACHE_ALIAS, local memory by default)
+in front of the durable database tier, like Django's cached_db engine. On top
+of that, save() skips both tiers when the session data is unchanged since it
+was loaded, which is the common case for a chat turn that re-assigns `state`
+or `selected_booking_id` to the value it already had. Keys holding None are
+dropped before encoding, since the views only ever read them with .get().
+
+The DB row is still rewritten once less than half of the session lifetime is
+left, so active sessions keep sliding forward instead of expiring.
+
+With several worker processes, point SESSION_CACHE_ALIAS at a shared backend
+(Redis, Memcached): a per-process local-memory tier can't see another
+worker's writes.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.utils import timezone
+
+KEY_PREFIX = 'support.session_backend'
+
+logger = logging.getLogger('django.contrib.sessions')
+
+
+def _compact(session_dict):
+    return {k: v for k, v in session_dict.items() if v is not None}
+
+
+def _digest(session_dict):
+    blob = json.dumps(_compact(session_dict), sort_keys=True, default=str)
+    return hashlib.blake2b(blob.encode(), digest_size=16).digest()
+
+
+class SessionStore(DBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        # What the stored copy looks like, so save() can tell if anything changed
+        self._stored_digest = None
+        self._stored_expiry = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def encode(self, session_dict):
+        return super().encode(_compact(session_dict))
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Some backends raise on invalid cache keys; treat as a miss
+            entry = None
+
+        if entry is not None:
+            data, expire_date = entry
+            if expire_date > timezone.now():
+                self._remember(data, expire_date)
+                return dict(data)
+
+        s = self._get_session_from_db()
+        if not s:
+            return {}
+        data = self.decode(s.session_data)
+        self._cache_set(data, s.expire_date)
+        self._remember(data, s.expire_date)
+        return data
+
+    def _remember(self, data, expire_date):
+        self._stored_digest = _digest(data)
+        self._stored_expiry = expire_date
+
+    def _cache_set(self, data, expire_date):
+        try:
+            self._cache.set(self.cache_key, (_compact(data), expire_date), self.get_expiry_age(expiry=expire_date))
+        except Exception:
+            logger.exception('Error saving to cache (%s)', self._cache)
+
+    def _refresh_due(self):
+        if self._stored_expiry is None:
+            return True
+        remaining = self._stored_expiry - timezone.now()
+        return remaining < timedelta(seconds=self.get_expiry_age() / 2)
+
+    def save(self, must_create=False):
+        data = self._get_session(no_load=must_create)
+        if (not must_create and self.session_key is not None
+                and _digest(data) == self._stored_digest and not self._refresh_due()):
+            # Nothing changed: skip the DB write and the cache write
+            return
+        super().save(must_create)
+        expire_date = self.get_expiry_date()
+        self._cache_set(data, expire_date)
+        self._remember(data, expire_date)
+
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create)
+
+    def exists(self, session_key):
+        return (
+            session_key
+            and (self.cache_key_prefix + session_key) in self._cache
+            or super().exists(session_key)
+        )
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    async def adelete(self, session_key=None):
+        return await sync_to_async(self.delete)(session_key)
+
+    def flush(self):
+        """Remove the current session data from both tiers and regenerate the key"""
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+        self._stored_digest = None
+        self._stored_expiry = None
+
+    async def aflush(self):
+        return await sync_to_async(self.flush)()
@@ -0,0 +1,51 @@
+"""
+Keep the per-PNR active-bookings cache in step with writes to bookings, and
+push the changes to open chat sockets (support/broker.py).
+Connected in SupportConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import booking_cache, broker
+from .models import Booking, CancelledBooking, normalize_pnr
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_pnr(sender, instance, **kwargs):
+    # So a save that moves a booking to another PNR can invalidate the old one too
+    instance._loaded_pnr = instance.pnr
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_pnr(sender, instance, **kwargs):
+    booking_cache.invalidate(instance.pnr)
+    loaded_pnr = getattr(instance, '_loaded_pnr', None)
+    if loaded_pnr and normalize_pnr(loaded_pnr) != normalize_pnr(instance.pnr):
+        booking_cache.invalidate(loaded_pnr)
+    instance._loaded_pnr = instance.pnr
+
+
+# Pushes wait for the surrounding transaction (e.g. services.cancel_booking) to
+# commit, so sockets never hear about a change that is rolled back
+@receiver(post_save, sender=Booking)
+def push_booking_update(sender, instance, created, using, **kwargs):
+    event = 'created' if created else 'updated'
+    transaction.on_commit(lambda: broker.publish_booking_update(instance, event), using=using)
+
+
+@receiver(post_save, sender=CancelledBooking)
+def push_booking_cancelled(sender, instance, created, using, **kwargs):
+    if created:
+        transaction.on_commit(lambda: broker.publish_booking_update(instance.booking, 'cancelled'), using=using)
+
+
+@receiver(post_save, sender=CancelledBooking)
+@receiver(post_delete, sender=CancelledBooking)
+def invalidate_cancelled_booking_pnr(sender, instance, **kwargs):
+    try:
+        booking = instance.booking
+    except Booking.DoesNotExist:
+        return
+    booking_cache.invalidate(booking.pnr)
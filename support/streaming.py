@@ -0,0 +1,44 @@
+"""
+Server-Sent Events helpers for the streaming chat endpoint (/process/stream).
+
+A chat reply is sent as a sequence of events so the widget can render as soon
+as each part is ready: 'typing' straight away, then 'reply' with the text,
+then one event per structured payload in STREAM_PAYLOAD_FIELDS, and finally
+'done' carrying the remaining fields (action, booking_id, need_pnr, ...).
+A request that can't be answered gets a single 'error' event with a 'reply'
+text for the widget to show, with a 4xx status when nothing was streamed yet.
+"""
+import json
+
+from django.http import HttpResponse, StreamingHttpResponse
+
+# Reply fields sent as their own event after the reply text
+STREAM_PAYLOAD_FIELDS = ('bookings', 'booking')
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def reply_events(reply):
+    """Split a chat reply dict (as returned by process_message) into SSE events."""
+    yield sse_event('reply', {'reply': reply.get('reply')})
+    for field in STREAM_PAYLOAD_FIELDS:
+        if field in reply:
+            yield sse_event(field, reply[field])
+    rest = {k: v for k, v in reply.items() if k != 'reply' and k not in STREAM_PAYLOAD_FIELDS}
+    yield sse_event('done', rest)
+
+
+def sse_response(events):
+    """Wrap an (async) iterator of encoded events in a non-buffered SSE response."""
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def sse_error_response(data, status=400):
+    """A complete (non-streamed) SSE body holding one 'error' event, for requests rejected up front."""
+    return HttpResponse(sse_event('error', data), content_type='text/event-stream', status=status)
@@ -1,16 +1,23 @@
 from django.http import JsonResponse, HttpResponse
 from django.shortcuts import render
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 import json
-from datetime import datetime, timedelta
 from django.views.decorators.http import require_http_methods
-from .models import Booking, CancelledBooking, ProcessLog
+from .models import Booking, ProcessLog
 from .serializers import BookingSerializer, CreateBookingSerializer, CancelBookingSerializer, CancelledBookingSerializer
-from django.utils.dateparse import parse_datetime
 from .serializers import MessageSerializer, VerifyPNRSerializer
 from .models import Message
 import random
-from .intent_classifier import get_intent
+from .intent_classifier import get_intent, is_ready, classifier_mode, get_cache_stats, get_tier_stats, get_batch_stats
+from .dialog import DialogContext, DialogEngine
+from . import audit, booking_cache, query_budget, services
+from .idempotency import idempotent
+from .pagination import (
+    BOOKING_KEY, CANCELLATION_KEY, InvalidPageRequest, PageRequest, json_array_chunks, json_stream_response,
+    keyset, keyset_page, stream_chunk_size,
+)
+from .streaming import reply_events, sse_error_response, sse_event, sse_response
 
 
 def chat(request):
@@ -31,22 +38,44 @@ def api_check_session(request):
     return JsonResponse({'verified': False})
 
 
-def _mock_booking(pnr):
-    if pnr.lower() == 'notfound':
-        return None
-    now = datetime.utcnow()
-    return {
-        'pnr': pnr,
-        'flight_id': 1234,
-        'source_airport_code': 'JFK',
-        'destination_airport_code': 'LAX',
-        'scheduled_departure': (now + timedelta(days=1)).isoformat() + 'Z',
-        'scheduled_arrival': (now + timedelta(days=1, hours=6)).isoformat() + 'Z',
-        'assigned_seat': '12A',
-        'current_departure': (now + timedelta(days=1)).isoformat() + 'Z',
-        'current_arrival': (now + timedelta(days=1, hours=6)).isoformat() + 'Z',
-        'current_status': 'Scheduled',
-    }
+def api_ready(request):
+    """Readiness probe: 200 once the intent classifier is loaded, 503 while warming up"""
+    if not is_ready():
+        return JsonResponse({'ready': False}, status=503)
+    return JsonResponse({'ready': True, 'mode': classifier_mode()})
+
+
+def _listing_response(page, queryset, key, serializer_class, if_empty=None):
+    """
+    A page ({'results', 'next_cursor'}) or, with ?stream=1, the whole listing as a
+    streamed JSON array (see support/pagination.py). if_empty() answers instead
+    when there is nothing to list from the start.
+    """
+    if page.stream:
+        rows = keyset(queryset, key, page.cursor).iterator(chunk_size=stream_chunk_size())
+        first = next(rows, None)
+        if first is None and if_empty is not None and not page.cursor:
+            return if_empty()
+        return json_stream_response(json_array_chunks(rows, serializer_class, first))
+    rows, next_cursor = keyset_page(queryset, key, page.limit, page.cursor)
+    if not rows and if_empty is not None and not page.cursor:
+        return if_empty()
+    return JsonResponse({'results': serializer_class(rows, many=True).data, 'next_cursor': next_cursor})
+
+
+def _page_request(request):
+    """PageRequest for the listing, or a 400 response for bad limit/cursor values"""
+    try:
+        return PageRequest.from_request(request), None
+    except InvalidPageRequest as e:
+        return None, JsonResponse({'message': str(e)}, status=400)
+
+
+def _mock_booking_response(pnr):
+    data = services.mock_booking(pnr)
+    if not data:
+        return JsonResponse({'message': 'PNR Not Found'}, status=404)
+    return JsonResponse(data)
 
 
 def api_get_booking(request):
@@ -54,18 +83,22 @@ def api_get_booking(request):
     pnr = request.GET.get('pnr')
     if not pnr:
         return JsonResponse({'message': 'PNR Not Found'}, status=404)
-    qs = Booking.objects.filter(pnr__iexact=pnr)
-    if qs.exists():
-        serializer = BookingSerializer(qs, many=True)
+    page, error = _page_request(request)
+    if error:
+        return error
+    if page.paginated or page.stream:
+        return _listing_response(page, services.bookings_query(pnr), BOOKING_KEY, BookingSerializer,
+                                 if_empty=lambda: _mock_booking_response(pnr))
+    bookings = services.find_bookings(pnr)
+    if bookings:
+        serializer = BookingSerializer(bookings, many=True)
         return JsonResponse(serializer.data, safe=False)
     # fallback to mock
-    data = _mock_booking(pnr)
-    if not data:
-        return JsonResponse({'message': 'PNR Not Found'}, status=404)
-    return JsonResponse(data)
+    return _mock_booking_response(pnr)
 
 
 @csrf_exempt
+@idempotent('flight/cancel')
 def api_cancel_booking(request):
     try:
         payload = json.loads(request.body)
@@ -76,47 +109,19 @@ def api_cancel_booking(request):
     if not booking_id:
         return JsonResponse({'message': 'Booking id required'}, status=400)
     try:
-        booking = Booking.objects.get(id=booking_id)
-    except Booking.DoesNotExist:
+        cancelled, created = services.cancel_booking(
+            booking_id,
+            cancellation_charges=payload.get('cancellation_charges', 50.0),
+            refund_amount=payload.get('refund_amount', 0.0),
+            refund_date=payload.get('refund_date'),
+            payload=payload,
+        )
+    except services.BookingNotFound:
         return JsonResponse({'message': 'Booking Not Found'}, status=404)
-    # create cancellation entry
-    now = datetime.utcnow()
-    cancellation_charges = payload.get('cancellation_charges', 50.0)
-    refund_amount = payload.get('refund_amount', 0.0)
-    refund_date = payload.get('refund_date')
-    if isinstance(refund_date, str):
-        refund_date = parse_datetime(refund_date)
-    # If a cancellation already exists for this booking, return it instead of creating a duplicate
-    existing = CancelledBooking.objects.filter(booking=booking).first()
-    if existing:
-        serializer = CancelledBookingSerializer(existing)
-        # log the attempted cancel
-        try:
-            ProcessLog.objects.create(action='cancel', booking=booking, pnr=booking.pnr, payload=payload, result={'status':'exists'})
-        except Exception:
-            pass
+    serializer = CancelledBookingSerializer(cancelled)
+    if not created:
         return JsonResponse(serializer.data)
 
-    # Create cancellation record
-    cancelled = CancelledBooking.objects.create(
-        booking=booking,
-        cancellation_charges=cancellation_charges,
-        refund_amount=refund_amount,
-        refund_date=refund_date or (now + timedelta(days=5)),
-    )
-    
-    # Mark booking as Cancelled (keep it in database)
-    booking.current_status = 'Cancelled'
-    booking.save()
-    
-    serializer = CancelledBookingSerializer(cancelled)
-    
-    # Log cancellation
-    try:
-        ProcessLog.objects.create(action='cancel', booking=booking, pnr=booking.pnr, payload=payload, result=serializer.data)
-    except Exception:
-        pass
-    
     # Clear the selected booking from session since it's cancelled
     if 'selected_booking_id' in request.session and request.session['selected_booking_id'] == booking_id:
         del request.session['selected_booking_id']
@@ -153,21 +158,22 @@ def api_list_bookings_by_pnr(request):
     pnr = request.GET.get('pnr')
     if not pnr:
         return JsonResponse({'message': 'PNR required'}, status=400)
+    page, error = _page_request(request)
+    if error:
+        return error
     # Exclude cancelled bookings from the list
-    qs = Booking.objects.filter(pnr__iexact=pnr).exclude(current_status='Cancelled')
-    serializer = BookingSerializer(qs, many=True)
-    return JsonResponse(serializer.data, safe=False)
+    if page.paginated or page.stream:
+        return _listing_response(page, services.active_bookings_query(pnr), BOOKING_KEY, BookingSerializer)
+    return JsonResponse(services.active_bookings_data(pnr), safe=False)
 
 
 @csrf_exempt
 def api_get_booking_by_id(request, booking_id):
     """Get a single booking by ID (includes cancelled bookings for displaying after cancellation)"""
-    try:
-        booking = Booking.objects.get(id=booking_id)
-        serializer = BookingSerializer(booking)
-        return JsonResponse(serializer.data)
-    except Booking.DoesNotExist:
+    booking = services.get_booking(booking_id)
+    if booking is None:
         return JsonResponse({'message': 'Booking not found'}, status=404)
+    return JsonResponse(BookingSerializer(booking).data)
 
 
 @csrf_exempt
@@ -198,13 +204,8 @@ def api_pet_allowed(request):
     note = 'Pet allowed in cabin' if allowed else 'Pet not allowed for this fare/class'
     # log pet check
     try:
-        booking = None
-        if booking_id:
-            try:
-                booking = Booking.objects.get(id=booking_id)
-            except Exception:
-                booking = None
-        ProcessLog.objects.create(action='pets', booking=booking, pnr=(booking.pnr if booking else None), payload={'booking_id': booking_id}, result={'pet_allowed': allowed, 'note': note})
+        booking = services.get_booking(booking_id)
+        audit.record(ProcessLog(action='pets', booking=booking, pnr=(booking.pnr if booking else None), payload={'booking_id': booking_id}, result={'pet_allowed': allowed, 'note': note}))
     except Exception:
         pass
     return JsonResponse({'booking_id': booking_id, 'pet_allowed': allowed, 'note': note})
@@ -214,8 +215,13 @@ def api_cancelled_bookings(request):
     pnr = request.GET.get('pnr')
     if not pnr:
         return JsonResponse({'message': 'PNR required'}, status=400)
-    qs = CancelledBooking.objects.filter(booking__pnr__iexact=pnr)
-    serializer = CancelledBookingSerializer(qs, many=True)
+    page, error = _page_request(request)
+    if error:
+        return error
+    if page.paginated or page.stream:
+        return _listing_response(page, services.cancellations_query(pnr), CANCELLATION_KEY,
+                                 CancelledBookingSerializer)
+    serializer = CancelledBookingSerializer(services.cancelled_bookings(pnr), many=True)
     return JsonResponse(serializer.data, safe=False)
 
 
@@ -225,274 +231,292 @@ def api_available_seats(request):
         payload = json.loads(request.body)
     except Exception:
         return JsonResponse({'message': 'Invalid Request'}, status=400)
-    if payload.get('pnr') == 'notfound':
+    seats = services.available_seats(payload.get('pnr'))
+    if seats is None:
         return JsonResponse({'message': 'Flight Not Found'}, status=404)
-    seats = []
-    for r in range(20, 26):
-        seats.append({
-            'row_number': r,
-            'column_letter': 'A',
-            'price': 99.0 + r,
-            'class': 'Economy',
-        })
     return JsonResponse({'flight_id': payload.get('flight_id', 1234), 'pnr': payload.get('pnr'), 'available_seats': seats})
 
 
-@csrf_exempt
-def process_message(request):
+# Chat dialog: process_message parses the turn once into a DialogContext and
+# the engine routes (state, intent) straight to one of the handlers below.
+dialog = DialogEngine()
+
+# States that allow free-form input (like entering PNR); intent detection is skipped
+CONVERSATION_STATES = ('awaiting_pnr_for_cancel', 'awaiting_pnr_for_status', 'awaiting_pnr_for_seats', 'confirm_cancel')
+SHORT_INTENTS = ('cancel', 'status', 'seat', 'pets')
+POLICY_PHRASES = ('cancellation policy', 'cancel policy', 'refund policy')
+
+
+def _active_bookings_reply(ctx, reply):
+    bookings = services.active_bookings_data(ctx.verified_pnr)
+    return JsonResponse({'reply': reply, 'action': 'list_bookings', 'bookings': bookings})
+
+
+def _policy_reply(ctx):
+    if any(k in ctx.msg for k in POLICY_PHRASES):
+        return JsonResponse({'reply': 'Cancellation policies vary. See: https://www.jetblue.com/flying-with-us/our-fares'})
+    return None
+
+
+@dialog.route(None, 'booked_flights')
+def handle_booked_flights(ctx):
+    return _active_bookings_reply(ctx, 'Here are your bookings')
+
+
+@dialog.route(None, 'cancel')
+def handle_cancel(ctx):
+    if not ctx.booking_id:
+        return _active_bookings_reply(ctx, 'Please choose a booking for that action.')
+    # Let the frontend handle the cancellation flow
+    return JsonResponse({'reply': 'Are you sure you want to cancel this booking?', 'action': 'confirm_cancel', 'booking_id': ctx.booking_id})
+
+
+@dialog.route(None, 'status')
+def handle_status(ctx):
+    if not ctx.booking_id:
+        return _active_bookings_reply(ctx, 'Please choose a booking for that action.')
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    booking = services.get_booking(ctx.booking_id)
+    if booking is None:
+        return _active_bookings_reply(ctx, 'Which booking would you like to check?')
+    # Generate realistic flight status
+    flight_status = random.choice(['On Time', 'Departed', 'Arrived', 'Delayed'])
+    return JsonResponse({'reply': f'Flight {booking.flight_id} status: {flight_status}', 'booking': BookingSerializer(booking).data})
+
+
+@dialog.route(None, 'seat')
+def handle_seat(ctx):
+    if not ctx.booking_id:
+        return _active_bookings_reply(ctx, 'Please choose a booking for that action.')
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    booking = services.get_booking(ctx.booking_id)
+    if booking is None:
+        return _active_bookings_reply(ctx, 'Select booking to check seats for.')
+    return JsonResponse({'reply': f'Your assigned seat is: {booking.assigned_seat}', 'booking': BookingSerializer(booking).data})
+
+
+@dialog.route(None, 'pets')
+def handle_pets(ctx):
+    if not ctx.booking_id:
+        return _active_bookings_reply(ctx, 'Please choose a booking for that action.')
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    allowed = random.choice([True, False])
+    note = 'Pet allowed in cabin' if allowed else 'Pet not allowed for this fare/class'
+    try:
+        booking = services.get_booking(ctx.booking_id)
+        if booking is not None:
+            audit.record(ProcessLog(action='pets', booking=booking, pnr=booking.pnr, payload={'booking_id': ctx.booking_id}, result={'pet_allowed': allowed, 'note': note}))
+    except Exception:
+        pass
+    return JsonResponse({'reply': note, 'pet_allowed': allowed})
+
+
+@dialog.route(['awaiting_pnr_for_cancel', 'awaiting_pnr_for_status', 'awaiting_pnr_for_seats'])
+def handle_awaiting_pnr(ctx):
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    sess = ctx.session
+    # extract plausible pnr
+    tokens = ctx.msg.upper().split()
+    pnr = None
+    for t in tokens[::-1]:
+        if 3 <= len(t) <= 7 and t.isalnum():
+            pnr = t
+            break
+    if not pnr:
+        return JsonResponse({'reply': 'I could not find a PNR in your message. Please send the PNR (alphanumeric, 3-7 chars).'})
+
+    # prefer DB booking
+    found = services.find_booking(pnr)
+    booking = BookingSerializer(found).data if found else services.mock_booking(pnr)
+    if not booking:
+        return JsonResponse({'reply': 'PNR not found. Please check and resend.'})
+
+    # handle each state
+    if ctx.state == 'awaiting_pnr_for_cancel':
+        sess['state'] = 'confirm_cancel'
+        sess['pnr'] = pnr
+        sess.modified = True
+        return JsonResponse({'reply': f"Found booking for PNR {pnr}: flight {booking['flight_id']} from {booking['source_airport_code']} to {booking['destination_airport_code']} on {booking['scheduled_departure']}. Reply 'confirm' to cancel or 'abort' to keep."})
+
+    if ctx.state == 'awaiting_pnr_for_status':
+        sess['state'] = None
+        sess.modified = True
+        flight_status = random.choice(['On Time', 'Departed', 'Arrived', 'Delayed'])
+        return JsonResponse({'reply': f"Flight status for PNR {pnr}: {flight_status}. Scheduled departure: {booking['scheduled_departure']}"})
+
+    # awaiting_pnr_for_seats
+    seats = services.available_seats(pnr) or []
+    top3 = seats[:3]
+    text = 'Available seats: ' + ', '.join([f"{s['row_number']}{s['column_letter']} (${s['price']})" for s in top3])
+    sess['state'] = None
+    sess.modified = True
+    return JsonResponse({'reply': text})
+
+
+@dialog.route('confirm_cancel')
+def handle_confirm_cancel(ctx):
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    sess = ctx.session
+    if 'confirm' in ctx.msg:
+        pnr = sess.get('pnr') or ctx.verified_pnr
+        if not ctx.booking_id:
+            reply = 'Booking id required. Please select the booking you want to cancel.'
+        else:
+            try:
+                cancelled, _ = services.cancel_booking(ctx.booking_id, payload={'booking_id': ctx.booking_id, 'pnr': pnr})
+                reply = f"Booking cancelled. Cancellation charges: {cancelled.cancellation_charges}. Refund: {cancelled.refund_amount} (expected {cancelled.refund_date})."
+                if sess.get('selected_booking_id') == ctx.booking_id:
+                    del sess['selected_booking_id']
+            except services.BookingNotFound:
+                reply = 'Booking Not Found'
+        # persist bot message
+        try:
+            audit.record(Message(session_key=sess.session_key, sender='bot', text=reply, pnr=pnr))
+        except Exception:
+            pass
+        sess['state'] = None
+        sess.pop('pnr', None)
+        sess.modified = True
+        return JsonResponse({'reply': reply})
+
+    if 'abort' in ctx.msg:
+        sess['state'] = None
+        sess.pop('pnr', None)
+        sess.modified = True
+        return JsonResponse({'reply': 'Cancellation aborted. Let me know if you need anything else.'})
+
+    return handle_fallback(ctx)
+
+
+@dialog.route()
+def handle_fallback(ctx):
+    policy = _policy_reply(ctx)
+    if policy:
+        return policy
+    # Check status action: allow front-end to call process with message 'status' and booking_id
+    if ctx.payload_booking_id and 'status' in ctx.msg:
+        bk = services.get_booking(ctx.payload_booking_id)
+        if bk is None:
+            return JsonResponse({'reply': 'Booking not found'}, status=404)
+        # Generate realistic flight status
+        flight_status = random.choice(['On Time', 'Departed', 'Arrived', 'Delayed'])
+        # log status check
+        try:
+            audit.record(ProcessLog(action='status', booking=bk, pnr=bk.pnr, payload={'booking_id': bk.id}, result={'status': flight_status}))
+        except Exception:
+            pass
+        return JsonResponse({'reply': f"Booking {bk.id} status: {flight_status}"})
+
+    # Final fallback for any unhandled queries
+    return JsonResponse({'reply': 'Invalid query'})
+
+
+def chat_payload(request):
+    """The JSON object posted to the chat endpoints, or None if the body isn't one"""
     try:
         payload = json.loads(request.body)
     except Exception:
-        return JsonResponse({'reply': 'Invalid request'}, status=400)
-    msg = payload.get('message','').lower()
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+INVALID_CHAT_REQUEST = {'reply': 'Invalid request'}
 
+
+@csrf_exempt
+def process_message(request):
+    payload = chat_payload(request)
+    if payload is None:
+        return JsonResponse(INVALID_CHAT_REQUEST, status=400)
+    return chat_turn(request, payload)
+
+
+def chat_turn(request, payload):
+    """One dialog turn for an already parsed payload; shared by process_message and process_message_stream"""
     # Simple stateful dialog using session; require PNR verification first
-    sess = request.session
-    state = sess.get('state')
-    verified_pnr = sess.get('verified_pnr')
-    selected_booking_id = sess.get('selected_booking_id')  # Remember selected booking in session
+    ctx = DialogContext(request, payload)
 
     # Persist user message
     try:
-        Message.objects.create(session_key=request.session.session_key, sender='user', text=msg, pnr=verified_pnr)
+        audit.record(Message(session_key=request.session.session_key, sender='user', text=ctx.msg, pnr=ctx.verified_pnr))
     except Exception:
         pass
 
     # Start flows
-    if not verified_pnr:
+    if not ctx.verified_pnr:
         return JsonResponse({'reply': 'Please verify your PNR first by clicking the bot and entering your PNR.', 'need_pnr': True})
 
-    # Get booking_id from request payload (if user just selected a booking)
-    booking_id = None
-    try:
-        body = payload if isinstance(payload, dict) else {}
-        booking_id = body.get('booking_id')
-        # If user sends a booking_id, store it in session for future use
-        if booking_id:
-            sess['selected_booking_id'] = booking_id
-            selected_booking_id = booking_id
-            request.session.modified = True
-            # If message is just 'select', return success immediately (user clicked a booking)
-            if msg.strip() == 'select':
-                return JsonResponse({'reply': 'Booking selected'})
-    except Exception:
-        booking_id = None
-
-    # If no booking_id in request, use the one from session
-    if not booking_id and selected_booking_id:
-        booking_id = selected_booking_id
+    # If user sends a booking_id, store it in session for future use
+    if ctx.payload_booking_id:
+        request.session['selected_booking_id'] = ctx.payload_booking_id
+        request.session.modified = True
+        # If message is just 'select', return success immediately (user clicked a booking)
+        if ctx.msg.strip() == 'select':
+            return JsonResponse({'reply': 'Booking selected'})
 
-    # Use BERT-based intent classification instead of keyword matching
-    # States that allow free-form input (like entering PNR)
-    conversation_states = ['awaiting_pnr_for_cancel', 'awaiting_pnr_for_status', 'awaiting_pnr_for_seats', 'confirm_cancel']
-    
-    detected_intent = None
-    if state not in conversation_states and msg.strip() != 'select':
-        # Use AI to detect intent from natural language
+    # Use BERT-based intent classification, except while collecting free-form input
+    state = ctx.state if ctx.state in CONVERSATION_STATES else None
+    if state is None and ctx.msg.strip() != 'select':
         try:
-            intent, confidence = get_intent(msg)
-            
-            # If no intent detected or low confidence, reject
-            if intent is None:
-                return JsonResponse({'reply': 'Invalid query'})
-            
-            detected_intent = intent
+            ctx.intent, ctx.confidence = get_intent(ctx.msg)
         except Exception as e:
             # If BERT fails, fall back to basic validation
             print(f"Intent classification error: {e}")
             return JsonResponse({'reply': 'Invalid query'})
+        # If no intent detected or low confidence, reject
+        if ctx.intent is None:
+            return JsonResponse({'reply': 'Invalid query'})
 
-    short_intents = ['cancel', 'status', 'seat', 'pets']
-    # Only ask for booking selection if no booking is selected in session
-    if verified_pnr and not booking_id and detected_intent in short_intents:
-        qs = Booking.objects.filter(pnr__iexact=verified_pnr).exclude(current_status='Cancelled')
-        serializer = BookingSerializer(qs, many=True)
-        return JsonResponse({'reply': 'Please choose a booking for that action.', 'action': 'list_bookings', 'bookings': serializer.data})
-
-    # If user asks to see booked flights, return them (do not auto-list earlier)
-    if detected_intent == 'booked_flights':
-        qs = Booking.objects.filter(pnr__iexact=verified_pnr).exclude(current_status='Cancelled')
-        serializer = BookingSerializer(qs, many=True)
-        return JsonResponse({'reply': 'Here are your bookings', 'action': 'list_bookings', 'bookings': serializer.data})
-
-    if detected_intent == 'cancel':
-        # If a booking is already selected in session, proceed with cancellation
-        if booking_id:
-            # Let the frontend handle the cancellation flow
-            return JsonResponse({'reply': 'Are you sure you want to cancel this booking?', 'action': 'confirm_cancel', 'booking_id': booking_id})
-        # If PNR verified but no booking selected, return bookings so user can select which to cancel
-        if verified_pnr:
-            qs = Booking.objects.filter(pnr__iexact=verified_pnr).exclude(current_status='Cancelled')
-            serializer = BookingSerializer(qs, many=True)
-            return JsonResponse({'reply': 'Sure — select which booking you want to cancel.', 'action': 'list_bookings', 'bookings': serializer.data})
-        sess['state'] = 'awaiting_pnr_for_cancel'
-        request.session.modified = True
-        return JsonResponse({'reply': 'Sure — please provide your PNR so I can list your bookings.'})
-
-    if any(k in msg for k in ['cancellation policy', 'cancel policy', 'refund policy']):
-        return JsonResponse({'reply': 'Cancellation policies vary. See: https://www.jetblue.com/flying-with-us/our-fares'})
-
-    if detected_intent == 'status':
-        # If a booking is already selected, return its status
-        if booking_id:
-            try:
-                booking = Booking.objects.get(id=booking_id)
-                # Generate realistic flight status
-                flight_status = random.choice(['On Time', 'Departed', 'Arrived', 'Delayed'])
-                return JsonResponse({'reply': f'Flight {booking.flight_id} status: {flight_status}', 'booking': BookingSerializer(booking).data})
-            except Booking.DoesNotExist:
-                pass
-        # If PNR verified but no booking selected, return bookings for selection
-        if verified_pnr:
-            qs = Booking.objects.filter(pnr__iexact=verified_pnr).exclude(current_status='Cancelled')
-            serializer = BookingSerializer(qs, many=True)
-            return JsonResponse({'reply': 'Which booking would you like to check?', 'action': 'list_bookings', 'bookings': serializer.data})
-        sess['state'] = 'awaiting_pnr_for_status'
-        request.session.modified = True
-        return JsonResponse({'reply': 'Please provide your PNR so I can look up the flight status.'})
-
-    if detected_intent == 'seat':
-        # If a booking is already selected, show its seat info
-        if booking_id:
-            try:
-                booking = Booking.objects.get(id=booking_id)
-                return JsonResponse({'reply': f'Your assigned seat is: {booking.assigned_seat}', 'booking': BookingSerializer(booking).data})
-            except Booking.DoesNotExist:
-                pass
-        if verified_pnr:
-            qs = Booking.objects.filter(pnr__iexact=verified_pnr).exclude(current_status='Cancelled')
-            serializer = BookingSerializer(qs, many=True)
-            return JsonResponse({'reply': 'Select booking to check seats for.', 'action': 'list_bookings', 'bookings': serializer.data})
-        sess['state'] = 'awaiting_pnr_for_seats'
-        request.session.modified = True
-        return JsonResponse({'reply': 'Please provide your PNR to check seat availability.'})
-
-    if detected_intent == 'pets':
-        # If a booking is already selected, check pet policy for it
-        if booking_id:
-            allowed = random.choice([True, False])
-            note = 'Pet allowed in cabin' if allowed else 'Pet not allowed for this fare/class'
-            try:
-                booking = Booking.objects.get(id=booking_id)
-                ProcessLog.objects.create(action='pets', booking=booking, pnr=booking.pnr, payload={'booking_id': booking_id}, result={'pet_allowed': allowed, 'note': note})
-            except Exception:
-                pass
-            return JsonResponse({'reply': note, 'pet_allowed': allowed})
-        # If PNR verified but no booking selected, show bookings for selection
-        if verified_pnr:
-            qs = Booking.objects.filter(pnr__iexact=verified_pnr).exclude(current_status='Cancelled')
-            serializer = BookingSerializer(qs, many=True)
-            return JsonResponse({'reply': 'Select a booking to check pet travel rules.', 'action': 'list_bookings', 'bookings': serializer.data})
-        return JsonResponse({'reply': 'Pets: JetBlue allows small pets in-cabin and has specific rules. See: https://www.jetblue.com/traveling-together/traveling-with-pets'})
-
-    # If waiting for PNR in various flows
-    if state in ('awaiting_pnr_for_cancel', 'awaiting_pnr_for_status', 'awaiting_pnr_for_seats'):
-        # extract plausible pnr
-        tokens = msg.upper().split()
-        pnr = None
-        for t in tokens[::-1]:
-            if 3 <= len(t) <= 7 and t.isalnum():
-                pnr = t
-                break
-        if not pnr:
-            return JsonResponse({'reply': 'I could not find a PNR in your message. Please send the PNR (alphanumeric, 3-7 chars).'})
-
-        # prefer DB booking
-        booking_qs = Booking.objects.filter(pnr__iexact=pnr)
-        booking = None
-        if booking_qs.exists():
-            booking = BookingSerializer(booking_qs.first()).data
-        else:
-            booking = _mock_booking(pnr)
-        if not booking:
-            return JsonResponse({'reply': 'PNR not found. Please check and resend.'})
-
-        # handle each state
-        if state == 'awaiting_pnr_for_cancel':
-            sess['state'] = 'confirm_cancel'
-            sess['pnr'] = pnr
-            request.session.modified = True
-            return JsonResponse({'reply': f"Found booking for PNR {pnr}: flight {booking['flight_id']} from {booking['source_airport_code']} to {booking['destination_airport_code']} on {booking['scheduled_departure']}. Reply 'confirm' to cancel or 'abort' to keep."})
-
-        if state == 'awaiting_pnr_for_status':
-            sess['state'] = None
-            request.session.modified = True
-            flight_status = random.choice(['On Time', 'Departed', 'Arrived', 'Delayed'])
-            return JsonResponse({'reply': f"Flight status for PNR {pnr}: {flight_status}. Scheduled departure: {booking['scheduled_departure']}"})
-
-        if state == 'awaiting_pnr_for_seats':
-            # call available seats
-            payload = {
-                'pnr': pnr,
-                'flight_id': booking['flight_id'],
-                'source_airport_code': booking['source_airport_code'],
-                'destination_airport_code': booking['destination_airport_code'],
-                'scheduled_departure': booking['scheduled_departure'],
-                'scheduled_arrival': booking['scheduled_arrival'],
-            }
-            class DummyReq:
-                body = json.dumps(payload).encode()
-            seats_resp = api_available_seats(DummyReq())
-            seats_data = json.loads(seats_resp.content)
-            seats = seats_data.get('available_seats', [])
-            top3 = seats[:3]
-            text = 'Available seats: ' + ', '.join([f"{s['row_number']}{s['column_letter']} (${s['price']})" for s in top3])
-            sess['state'] = None
-            request.session.modified = True
-            return JsonResponse({'reply': text})
-
-    # Confirmation step
-    if state == 'confirm_cancel' and 'confirm' in msg:
-        pnr = sess.get('pnr') or verified_pnr or 'ABC123'
-        payload = {
-            'pnr': pnr,
-            'flight_id': 1234,
-            'source_airport_code': 'JFK',
-            'destination_airport_code': 'LAX',
-            'scheduled_departure': datetime.utcnow().isoformat()+'Z',
-            'scheduled_arrival': (datetime.utcnow()+timedelta(hours=6)).isoformat()+'Z'
-        }
-        class DummyReq:
-            body = json.dumps(payload).encode()
-        cancel_resp = api_cancel_booking(DummyReq())
-        data = json.loads(cancel_resp.content)
-        # persist bot message
-        try:
-            Message.objects.create(session_key=request.session.session_key, sender='bot', text=data.get('message'), pnr=pnr)
-        except Exception:
-            pass
-        sess['state'] = None
-        sess.pop('pnr', None)
-        request.session.modified = True
-        return JsonResponse({'reply': f"{data.get('message')}. Cancellation charges: {data.get('cancellation_charges')}. Refund: {data.get('refund_amount')} (expected {data.get('refund_date')})."})
+    return dialog.dispatch(ctx, state, ctx.intent)
 
-    if state == 'confirm_cancel' and 'abort' in msg:
-        sess['state'] = None
-        sess.pop('pnr', None)
-        request.session.modified = True
-        return JsonResponse({'reply': 'Cancellation aborted. Let me know if you need anything else.'})
 
-    # Check status action: allow front-end to call process with message 'status' and booking_id
-    try:
-        body = json.loads(request.body)
-    except Exception:
-        body = {}
-    if body.get('booking_id') and 'status' in msg:
+@csrf_exempt
+@require_http_methods(['POST'])
+def process_message_stream(request):
+    """Same as process_message, but streams the reply as Server-Sent Events."""
+    payload = chat_payload(request)
+    if payload is None:
+        return sse_error_response(INVALID_CHAT_REQUEST)
+
+    def events():
+        yield sse_event('typing', {})
         try:
-            bk = Booking.objects.get(id=body.get('booking_id'))
-            # Generate realistic flight status
-            flight_status = random.choice(['On Time', 'Departed', 'Arrived', 'Delayed'])
-            # log status check
-            try:
-                ProcessLog.objects.create(action='status', booking=bk, pnr=bk.pnr, payload={'booking_id': bk.id}, result={'status': flight_status})
-            except Exception:
-                pass
-            return JsonResponse({'reply': f"Booking {bk.id} status: {flight_status}"})
-        except Booking.DoesNotExist:
-            return JsonResponse({'reply': 'Booking not found'}, status=404)
-
-    # Final fallback for any unhandled queries
-    return JsonResponse({'reply': 'Invalid query'})
+            response = chat_turn(request, payload)
+        except Exception as e:
+            print(f"Chat turn failed: {e}")
+            yield sse_event('error', {'reply': 'Sorry, something went wrong. Please try again.'})
+            return
+        # SessionMiddleware has already run by the time the body is streamed
+        if request.session.modified:
+            request.session.save()
+        yield from reply_events(json.loads(response.content))
+
+    return sse_response(events())
+
+
+def api_metrics(request):
+    """In-process performance counters; only served when METRICS_ENABLED is on"""
+    if not settings.METRICS_ENABLED:
+        return JsonResponse({'message': 'Not Found'}, status=404)
+    return JsonResponse({
+        'dialog_handlers': dialog.stats(),
+        'bookings_cache': booking_cache.stats(),
+        'intent_cache': get_cache_stats(),
+        'intent_tiers': get_tier_stats(),
+        'intent_batching': get_batch_stats(),
+        'audit_writer': audit.stats(),
+        'db_queries': query_budget.stats(),
+    })
 
 
 @csrf_exempt
@@ -505,13 +529,13 @@ def verify_pnr(request):
     if not ser.is_valid():
         return JsonResponse({'message': 'Invalid input', 'errors': ser.errors}, status=400)
     pnr = ser.validated_data['pnr']
-    exists = Booking.objects.filter(pnr__iexact=pnr).exists()
+    exists = services.pnr_exists(pnr)
     if exists:
         request.session['verified_pnr'] = pnr
         request.session.modified = True
         try:
             # record verification
-            ProcessLog.objects.create(action='verify_pnr', pnr=pnr, payload={'exists': True}, result={'exists': True})
+            audit.record(ProcessLog(action='verify_pnr', pnr=pnr, payload={'exists': True}, result={'exists': True}))
         except Exception:
             pass
     return JsonResponse({'pnr': pnr, 'exists': exists})
@@ -526,10 +550,11 @@ def log_message(request):
     text = payload.get('text')
     sender = payload.get('sender','user')
     pnr = request.session.get('verified_pnr')
+    # Saved here rather than through the audit writer: the caller wants the row's id back
     msg = Message.objects.create(session_key=request.session.session_key, sender=sender, text=text, pnr=pnr)
     return JsonResponse({'id': msg.id, 'created_at': msg.created_at.isoformat()})
 
 
 def api_get_booking_fake(pnr):
     # reuse mock
-    return _mock_booking(pnr)
+    return services.mock_booking(pnr)
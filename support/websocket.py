@@ -0,0 +1,175 @@
+"""
+Persistent chat channel: a raw ASGI WebSocket app mounted at /ws/chat by asapp/asgi.py.
+
+Each text frame is a JSON object with the same fields process_message takes
+({"message": ..., "booking_id": ...}) and gets the same reply object back,
+tagged {"type": "reply"}. An unverified connection can send
+{"type": "verify", "pnr": ...} first; a connection opened with a session
+cookie that already has a verified PNR skips that.
+
+The PNR is checked once per connection and dialog state (state, selected
+booking) lives in connection memory; it is written back to the HTTP session
+when the socket closes so the widget's POST path picks up where it left off.
+While open, the socket also receives booking_update/flight_update events for
+its PNR from support/broker.py.
+"""
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from importlib import import_module
+
+from django.conf import settings
+
+from . import audit, services
+from .broker import get_broker
+
+# Session keys the dialog reads and writes; copied in on connect, back out on close
+DIALOG_SESSION_KEYS = ('verified_pnr', 'selected_booking_id', 'state', 'pnr')
+
+
+class ConnectionSession(dict):
+    """Dialog state for one socket; quacks enough like request.session for the dialog handlers"""
+
+    def __init__(self, session_key=None, data=None):
+        super().__init__(data or {})
+        self.session_key = session_key
+        self.modified = False
+
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aset(self, key, value):
+        self[key] = value
+        self.modified = True
+
+
+class ConnectionRequest:
+    """Stand-in for the HttpRequest the dialog handlers are given"""
+    method = 'WEBSOCKET'
+
+    def __init__(self, scope, session):
+        self.scope = scope
+        self.path = scope.get('path', '')
+        self.session = session
+
+
+def _session_cookie(scope):
+    for name, value in scope.get('headers', ()):
+        if name == b'cookie':
+            cookie = SimpleCookie(value.decode('latin-1'))
+            morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+            return morsel.value if morsel else None
+    return None
+
+
+def _session_store(session_key):
+    return import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+
+
+async def _load_session(scope):
+    session_key = _session_cookie(scope)
+    data = {}
+    if session_key:
+        store = _session_store(session_key)
+        for key in DIALOG_SESSION_KEYS:
+            value = await store.aget(key)
+            if value is not None:
+                data[key] = value
+    return ConnectionSession(session_key, data)
+
+
+async def _save_session(session):
+    if not session.modified or not session.session_key:
+        return
+    store = _session_store(session.session_key)
+    for key in DIALOG_SESSION_KEYS:
+        value = session.get(key)
+        if value is None:
+            await store.apop(key, None)
+        else:
+            await store.aset(key, value)
+    await store.asave()
+
+
+async def _send_json(send, data):
+    await send({'type': 'websocket.send', 'text': json.dumps(data)})
+
+
+async def _push_updates(queue, send):
+    while True:
+        event = await queue.get()
+        await _send_json(send, event)
+
+
+async def chat_socket(scope, receive, send):
+    # Imported here so asapp/asgi.py can import this module before the app registry is ready
+    from .async_views import chat_turn
+    from .models import ProcessLog
+    from .serializers import VerifyPNRSerializer
+
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    session = await _load_session(scope)
+    request = ConnectionRequest(scope, session)
+    await send({'type': 'websocket.accept'})
+
+    broker = get_broker()
+    subscribed_pnr, queue, pusher = None, None, None
+
+    def subscribe(pnr):
+        nonlocal subscribed_pnr, queue, pusher
+        if pnr == subscribed_pnr:
+            return
+        unsubscribe()
+        subscribed_pnr = pnr
+        queue = broker.subscribe(pnr)
+        pusher = asyncio.create_task(_push_updates(queue, send))
+
+    def unsubscribe():
+        nonlocal subscribed_pnr, queue, pusher
+        if pusher is not None:
+            pusher.cancel()
+            broker.unsubscribe(subscribed_pnr, queue)
+        subscribed_pnr, queue, pusher = None, None, None
+
+    if session.get('verified_pnr'):
+        subscribe(session['verified_pnr'])
+
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] != 'websocket.receive':
+                continue
+            try:
+                payload = json.loads(message.get('text') or message.get('bytes') or b'')
+            except ValueError:
+                payload = None
+            if not isinstance(payload, dict):
+                await _send_json(send, {'type': 'error', 'reply': 'Invalid request'})
+                continue
+
+            if payload.get('type') == 'verify':
+                ser = VerifyPNRSerializer(data=payload)
+                if not ser.is_valid():
+                    await _send_json(send, {'type': 'error', 'message': 'Invalid input', 'errors': ser.errors})
+                    continue
+                pnr = ser.validated_data['pnr']
+                exists = await services.apnr_exists(pnr)
+                if exists:
+                    await session.aset('verified_pnr', pnr)
+                    subscribe(pnr)
+                    try:
+                        await audit.arecord(ProcessLog(action='verify_pnr', pnr=pnr, payload={'exists': True, 'channel': 'websocket'}, result={'exists': True}))
+                    except Exception:
+                        pass
+                await _send_json(send, {'type': 'verify', 'pnr': pnr, 'exists': exists})
+                continue
+
+            response = await chat_turn(request, payload)
+            await _send_json(send, {'type': 'reply', **json.loads(response.content)})
+    finally:
+        unsubscribe()
+        await _save_session(session)
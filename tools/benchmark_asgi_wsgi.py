@@ -0,0 +1,146 @@
+"""
+Compare chat throughput and latency under WSGI (gunicorn, sync views) and
+ASGI (uvicorn, async views).
+
+Each simulated client keeps its own session cookie, verifies a PNR and then
+sends a stream of chat messages to /process, so the run exercises session
+reads/writes, the intent classifier and the booking queries together.
+Reports requests/s and p50/p99 latency per server.
+
+By default the servers are started here (gunicorn and uvicorn must be
+installed); pass --wsgi-url/--asgi-url to measure servers you started
+yourself (remember ASAPP_ASYNC_VIEWS=1 for the ASGI one).
+
+Usage: python tools/benchmark_asgi_wsgi.py [--clients 50] [--messages 20] [--pnr ABC123]
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MESSAGES = [
+    'show my bookings',
+    'what is my flight status',
+    'which seat do I have',
+    'can I bring my dog',
+    'cancel my flight',
+]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def post(conn, path, body, cookie):
+    headers = {'Content-Type': 'application/json'}
+    if cookie:
+        headers['Cookie'] = cookie
+    start = time.perf_counter()
+    conn.request('POST', path, json.dumps(body), headers)
+    resp = conn.getresponse()
+    resp.read()
+    elapsed = (time.perf_counter() - start) * 1000
+    set_cookie = resp.getheader('Set-Cookie')
+    if set_cookie:
+        cookie = set_cookie.split(';', 1)[0]
+    return resp.status, elapsed, cookie
+
+
+def run_client(url, pnr, messages, timings, errors):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+    cookie = None
+    try:
+        status, elapsed, cookie = post(conn, '/api/verify_pnr', {'pnr': pnr}, cookie)
+        timings.append(elapsed)
+        for i in range(messages):
+            status, elapsed, cookie = post(conn, '/process', {'message': MESSAGES[i % len(MESSAGES)]}, cookie)
+            timings.append(elapsed)
+            if status != 200:
+                errors.append(status)
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        conn.close()
+
+
+def wait_ready(url, timeout=120):
+    parsed = urlparse(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=2)
+            conn.request('GET', '/api/ready')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def start_server(kind, port, workers):
+    env = dict(os.environ)
+    if kind == 'wsgi':
+        cmd = [sys.executable, '-m', 'gunicorn', 'asapp.wsgi:application', '-b', f'127.0.0.1:{port}',
+               '-w', str(workers), '--threads', '8']
+    else:
+        env['ASAPP_ASYNC_VIEWS'] = '1'
+        cmd = [sys.executable, '-m', 'uvicorn', 'asapp.asgi:application', '--host', '127.0.0.1',
+               '--port', str(port), '--workers', str(workers), '--log-level', 'warning']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+
+def bench(name, url, args):
+    if not wait_ready(url):
+        print(f'{name}: server at {url} did not become ready')
+        return
+    timings, errors = [], []
+    threads = [threading.Thread(target=run_client, args=(url, args.pnr, args.messages, timings, errors))
+               for _ in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    print(f'{name:5s} {len(timings) / wall:8.1f} req/s  p50 {percentile(timings, 50):7.1f} ms  '
+          f'p99 {percentile(timings, 99):7.1f} ms  errors {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--pnr', default='ABC123')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--wsgi-url')
+    parser.add_argument('--asgi-url')
+    args = parser.parse_args()
+
+    print(f'{args.clients} clients x {args.messages} messages')
+    for kind, url, port in (('wsgi', args.wsgi_url, 8101), ('asgi', args.asgi_url, 8102)):
+        proc = None
+        if not url:
+            url = f'http://127.0.0.1:{port}'
+            proc = start_server(kind, port, args.workers)
+        try:
+            bench(kind, url, args)
+        finally:
+            if proc:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == '__main__':
+    main()
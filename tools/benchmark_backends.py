@@ -0,0 +1,117 @@
+"""
+Compare intent encoder backends (torch vs ONNX Runtime int8).
+
+For every backend this reports single-query p50/p99 latency and peak RSS,
+each backend measured in its own subprocess so memory numbers don't mix.
+It also checks parity: every backend must pick the same intent as torch on
+the INTENT_EXAMPLES corpus (leave-one-out) and on a set of held-out phrasings.
+
+Usage: python tools/benchmark_backends.py [--backends torch onnx-int8] [--runs 300]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asapp.settings')
+
+HELD_OUT = [
+    'I need to cancel my trip to LAX',
+    'please remove my reservation',
+    'what bookings are under my pnr',
+    'list all flights I booked',
+    'is flight 1111 delayed',
+    'when does my plane leave',
+    'which seat did I get',
+    'can I pick a window seat',
+    'is my dog allowed in the cabin',
+    'rules for flying with a cat',
+]
+
+
+def run_worker(backend, runs):
+    import django
+    django.setup()
+    import numpy as np
+    from support.intent_classifier import IntentClassifier
+
+    clf = IntentClassifier(backend=backend)
+    if clf.model is None:
+        return {'backend': backend, 'error': 'backend failed to load'}
+
+    # Leave-one-out: each example scored against every *other* example
+    matrix = np.asarray(clf.example_matrix)
+    sims = matrix @ matrix.T
+    np.fill_diagonal(sims, -np.inf)
+    loo = np.maximum.reduceat(sims, clf._intent_offsets, axis=1).argmax(axis=1)
+    predictions = [clf.intent_names[i] for i in loo]
+    predictions += [intent for intent, _ in clf._classify_uncached(HELD_OUT, 0.5)]
+
+    queries = [q for examples in clf.intent_examples.values() for q in examples] + HELD_OUT
+    for q in queries[:10]:
+        clf._classify_uncached([q], 0.5)
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        clf._classify_uncached([queries[i % len(queries)]], 0.5)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'backend': backend,
+        'encoder': clf.model.name,
+        'predictions': predictions,
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx-int8'])
+    parser.add_argument('--runs', type=int, default=300)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.runs)))
+        return 0
+
+    backends = args.backends if 'torch' in args.backends else ['torch'] + args.backends
+    results = {}
+    for backend in backends:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', backend, '--runs', str(args.runs)],
+            capture_output=True, text=True,
+        )
+        lines = out.stdout.strip().splitlines()
+        try:
+            results[backend] = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            results[backend] = {'backend': backend, 'error': out.stderr.strip()[-500:] or 'no output'}
+
+    print(f"{'backend':<12} {'p50 ms':>8} {'p99 ms':>8} {'peak RSS MB':>12} {'parity':>8}")
+    reference = results['torch'].get('predictions')
+    ok = reference is not None
+    for backend in backends:
+        r = results[backend]
+        if 'error' in r:
+            print(f"{backend:<12} ERROR: {r['error']}")
+            ok = False
+            continue
+        mismatches = [i for i, (a, b) in enumerate(zip(reference or [], r['predictions'])) if a != b]
+        parity = 'n/a' if reference is None else f"{len(r['predictions']) - len(mismatches)}/{len(r['predictions'])}"
+        ok = ok and not mismatches
+        print(f"{backend:<12} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['peak_rss_mb']:>12.1f} {parity:>8}")
+
+    print('\nParity OK' if ok else '\nParity FAILED')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark the intent indexes on synthetic example sets (10k and 100k examples
+by default) and check them against brute-force scoring.
+
+For every index this reports build time, single-query p50/p99 latency, how
+often it picks the same best intent as brute force, and the largest score
+difference on those agreeing queries (should be ~0: candidates are rescored
+exactly). First, every index is checked against a per-intent loop on a small
+set where the first, a middle and the last intent have no examples; those
+must score -inf. Pure NumPy, no model needed.
+
+Usage: python tools/benchmark_intent_index.py [--sizes 10000 100000] [--queries 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from support.intent_index import INDEXES, build_index  # noqa: E402
+
+
+def synthetic(n_examples, n_intents, dim, seed=0):
+    """Clustered unit vectors: each intent has a centre and noisy paraphrases around it"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_intents, dim)).astype(np.float32)
+    intent_ids = np.sort(rng.integers(0, n_intents, n_examples))
+    matrix = centres[intent_ids] + 0.9 * rng.normal(size=(n_examples, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix, intent_ids, centres
+
+
+def queries_for(centres, n_queries, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(centres), n_queries)
+    queries = centres[picks] + 1.1 * rng.normal(size=(n_queries, centres.shape[1])).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def check_empty_intents(dim=16, seed=2):
+    """Exact scores of every index when some intents have no examples; returns the failures"""
+    rng = np.random.default_rng(seed)
+    n_intents = 7
+    empty = [0, 3, 6]
+    intent_ids = np.sort(np.repeat([i for i in range(n_intents) if i not in empty], [4, 1, 3, 2]))
+    matrix = rng.normal(size=(len(intent_ids), dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    queries = rng.normal(size=(20, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    expected = np.full((len(queries), n_intents), -np.inf, dtype=np.float32)
+    for intent in range(n_intents):
+        rows = matrix[intent_ids == intent]
+        if len(rows):
+            expected[:, intent] = (queries @ rows.T).max(axis=1)
+
+    failures = []
+    for kind in INDEXES:
+        # Enough candidates and probes that every index is exact here
+        try:
+            index = build_index(kind, matrix, intent_ids, n_intents, top_k=n_intents, nprobe=len(matrix))
+            scores = index.score(queries)
+        except Exception as e:
+            failures.append(f'{kind}: {type(e).__name__}: {e}')
+            continue
+        if not np.isneginf(scores[:, empty]).all():
+            failures.append(f'{kind}: intents without examples scored {scores[:, empty].max():.3f}')
+        if not np.allclose(scores[:, ~np.isin(np.arange(n_intents), empty)],
+                           expected[:, ~np.isin(np.arange(n_intents), empty)], atol=1e-5):
+            failures.append(f'{kind}: scores differ from the per-intent loop')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark intent indexes against brute force')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--examples-per-intent', type=int, default=20)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--top-k', type=int, default=8)
+    parser.add_argument('--nprobe', type=int, default=8)
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    parser.add_argument('--min-agreement', type=float, default=0.95)
+    args = parser.parse_args()
+
+    failures = check_empty_intents()
+    for failure in failures:
+        print(f'FAIL empty intents, {failure}')
+    if not failures:
+        print('Intents without examples: every index exact')
+    ok = not failures
+    for n in args.sizes:
+        n_intents = max(2, n // args.examples_per_intent)
+        matrix, intent_ids, centres = synthetic(n, n_intents, args.dim)
+        queries = queries_for(centres, args.queries)
+        print(f'\n{n} examples, {n_intents} intents, dim {args.dim}')
+        print(f"{'index':<10} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {'agree':>7} {'max diff':>9}")
+
+        reference = None
+        for kind in INDEXES:
+            start = time.perf_counter()
+            index = build_index(kind, matrix, intent_ids, n_intents, top_k=args.top_k, nprobe=args.nprobe)
+            build_s = time.perf_counter() - start
+
+            timings, best, best_scores = [], [], []
+            for q in queries:
+                start = time.perf_counter()
+                scores = index.score(q[None, :])[0]
+                timings.append((time.perf_counter() - start) * 1000)
+                best.append(int(scores.argmax()))
+                best_scores.append(float(scores.max()))
+            best, best_scores = np.array(best), np.array(best_scores)
+            if reference is None:
+                reference = (best, best_scores)
+
+            agree = best == reference[0]
+            max_diff = float(np.abs(best_scores[agree] - reference[1][agree]).max()) if agree.any() else float('nan')
+            print(f'{kind:<10} {build_s:>8.2f} {np.percentile(timings, 50):>8.3f} '
+                  f'{np.percentile(timings, 99):>8.3f} {agree.mean():>7.1%} {max_diff:>9.2e}')
+            if agree.mean() < args.min_agreement or not max_diff <= args.tolerance:
+                ok = False
+
+    print('\nAll indexes within tolerance' if ok else '\nSome index disagreed with brute force beyond tolerance')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Memory and latency of the booking listing modes for one large (group) PNR.
+
+Seeds a throwaway SQLite database with --segments bookings on a single PNR and
+fetches /api/flight/booking three ways: the full list in one JsonResponse,
+?stream=1 (rows read with .iterator(), see support/pagination.py), and keyset
+pages of --limit rows walked to the end. Reports wall time, bytes sent and the
+peak Python memory (tracemalloc) of each; the first and the last page are
+timed separately to show deep pages cost the same as the first.
+
+Usage: python tools/benchmark_listings.py [--segments 20000] [--limit 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asapp.settings')
+
+PNR = 'GROUP1'
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--segments', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+    tmp = tempfile.TemporaryDirectory()
+    for alias in settings.DATABASES:
+        settings.DATABASES[alias]['NAME'] = os.path.join(tmp.name, 'listings.sqlite3')
+    settings.AUDIT_WRITE_BEHIND = False
+    django.setup()
+
+    from datetime import timedelta
+    from django.core.management import call_command
+    from django.test import Client
+    from django.utils import timezone
+    from support.models import Booking
+
+    call_command('migrate', verbosity=0)
+    now = timezone.now()
+    Booking.objects.bulk_create([
+        Booking(pnr=PNR, flight_id=1000 + i % 300, source_airport_code='JFK', destination_airport_code='LAX',
+                scheduled_departure=now + timedelta(hours=i % 2000), scheduled_arrival=now + timedelta(hours=i % 2000 + 6),
+                assigned_seat='12A')
+        for i in range(args.segments)
+    ], batch_size=1000)
+    client = Client()
+    url = f'/api/flight/booking?pnr={PNR}'
+
+    def full():
+        return len(client.get(url).content)
+
+    def stream():
+        return sum(len(chunk) for chunk in client.get(url + '&stream=1').streaming_content)
+
+    page_times = []
+
+    def pages():
+        size, cursor = 0, None
+        while True:
+            start = time.perf_counter()
+            r = client.get(url + f'&limit={args.limit}' + (f'&cursor={cursor}' if cursor else ''))
+            page_times.append((time.perf_counter() - start) * 1000)
+            size += len(r.content)
+            cursor = r.json()['next_cursor']
+            if not cursor:
+                return size
+
+    full()  # warm up imports and the statement cache
+    print(f'{args.segments} segments on one PNR')
+    print(f"{'mode':<22} {'ms':>9} {'bytes':>11} {'peak MiB':>9}")
+    for label, fn in (('full JsonResponse', full), ('stream=1', stream), (f'pages of {args.limit}', pages)):
+        elapsed, size, peak = measure(fn)
+        print(f'{label:<22} {elapsed:>9.1f} {size:>11,} {peak / 2 ** 20:>9.2f}')
+    print(f'first page {page_times[0]:.2f} ms, last page {page_times[-1]:.2f} ms ({len(page_times)} pages)')
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Mixed read/cancel load against SQLite under the development and production
+database profiles (ASAPP_DB_PROFILE, see asapp/settings.py).
+
+Each profile runs in its own subprocess on a freshly migrated and seeded copy
+of the database. Reader threads do booking lookups by PNR and id while writer
+threads cancel bookings through services.cancel_booking (which also writes a
+ProcessLog row). Every operation is wrapped like a request (connections are
+closed or kept per CONN_MAX_AGE), so per-request reconnects count too.
+Reports ops/s, p50/p99 latency and "database is locked" errors per operation.
+
+Usage: python tools/benchmark_sqlite_profile.py [--readers 8] [--writers 2] [--seconds 10]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asapp.settings')
+
+PROFILES = ('development', 'production')
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_worker(db_path, readers, writers, seconds, bookings):
+    import django
+    from django.conf import settings
+    for alias in settings.DATABASES:
+        settings.DATABASES[alias]['NAME'] = db_path
+    # Measure the database, not the write-behind queue in front of it
+    settings.AUDIT_WRITE_BEHIND = False
+    django.setup()
+
+    from datetime import timedelta
+    from django.core.management import call_command
+    from django.db import OperationalError, close_old_connections, connections
+    from django.utils import timezone
+    from support import services
+    from support.models import Booking
+
+    call_command('migrate', verbosity=0)
+    now = timezone.now()
+    Booking.objects.bulk_create([
+        Booking(pnr=f'B{i:06d}', flight_id=1000 + i % 100, source_airport_code='JFK', destination_airport_code='LAX',
+                scheduled_departure=now + timedelta(days=1), scheduled_arrival=now + timedelta(days=1, hours=6),
+                assigned_seat='12A')
+        for i in range(bookings)
+    ])
+    ids = list(Booking.objects.order_by('id').values_list('id', flat=True))
+    close_old_connections()
+    connections.close_all()
+
+    results = {'read': [], 'cancel': []}
+    errors = {'read': 0, 'cancel': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    cancel_ids = iter(ids)
+
+    def timed(kind, fn):
+        close_old_connections()  # what request_started does
+        start = time.perf_counter()
+        try:
+            fn()
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                results[kind].append(elapsed)
+        except OperationalError:
+            with lock:
+                errors[kind] += 1
+        finally:
+            close_old_connections()  # what request_finished does
+
+    def reader(n):
+        i = n
+        while time.monotonic() < deadline:
+            booking_id = ids[i % len(ids)]
+            timed('read', lambda: (services.active_bookings(f'B{booking_id % bookings:06d}'),
+                                   services.get_booking(booking_id)))
+            i += 7
+        connections.close_all()
+
+    def writer():
+        while time.monotonic() < deadline:
+            with lock:
+                booking_id = next(cancel_ids, None)
+            if booking_id is None:
+                break
+            timed('cancel', lambda: services.cancel_booking(booking_id))
+        connections.close_all()
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    report = {'profile': settings.DB_PROFILE}
+    for kind in ('read', 'cancel'):
+        report[kind] = {
+            'ops_per_s': len(results[kind]) / wall,
+            'p50_ms': percentile(results[kind], 50),
+            'p99_ms': percentile(results[kind], 99),
+            'errors': errors[kind],
+        }
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=PROFILES)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.db, args.readers, args.writers, args.seconds, args.bookings)
+        return
+
+    print(f'{args.readers} readers, {args.writers} writers, {args.seconds:.0f}s, {args.bookings} bookings')
+    print(f"{'profile':<12} {'op':<7} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, ASAPP_DB_PROFILE=profile)
+            out = subprocess.run(
+                [sys.executable, __file__, '--worker', '--db', os.path.join(tmp, 'bench.sqlite3'),
+                 '--readers', str(args.readers), '--writers', str(args.writers),
+                 '--seconds', str(args.seconds), '--bookings', str(args.bookings)],
+                env=env, capture_output=True, text=True,
+            )
+        if out.returncode != 0:
+            print(f'{profile}: worker failed\n{out.stderr[-2000:]}')
+            continue
+        report = json.loads(out.stdout.strip().splitlines()[-1])
+        for kind in ('read', 'cancel'):
+            r = report[kind]
+            print(f"{profile:<12} {kind:<7} {r['ops_per_s']:>9.1f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
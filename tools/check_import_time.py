@@ -0,0 +1,73 @@
+"""
+Import-time budget check.
+
+Runs `python -X importtime` on Django setup plus the URLconf and support views
+(what every manage.py command, migration and request worker loads) and fails if
+the cumulative import time is over budget or if any heavy ML module was pulled
+in eagerly. torch and sentence-transformers must only load on first classification.
+
+Usage: python tools/check_import_time.py [--budget-ms 1500] [--top 15]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_CODE = (
+    "import django; django.setup(); "
+    "import asapp.urls, support.views, support.intent_classifier"
+)
+FORBIDDEN = ('torch', 'sentence_transformers', 'transformers', 'onnxruntime', 'sklearn', 'scipy')
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def measure():
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='asapp.settings')
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        raise SystemExit(f'startup import failed:\n{out.stderr[-2000:]}')
+    modules = []
+    for line in out.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent)))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if startup imports are too slow or too heavy')
+    parser.add_argument('--budget-ms', type=float, default=1500.0)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    modules = measure()
+    # Top-level entries (no extra indent) cover everything imported beneath them
+    total_ms = sum(cum for _, _, cum, level in modules if level == 0) / 1000
+    heavy = sorted({name for name, _, _, _ in modules if name.split('.')[0] in FORBIDDEN})
+
+    print(f'Startup imports: {len(modules)} modules, {total_ms:.0f} ms cumulative (budget {args.budget_ms:.0f} ms)')
+    print('\nSlowest modules (self time):')
+    for name, self_us, _, _ in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f'  {self_us / 1000:8.1f} ms  {name}')
+
+    ok = True
+    if heavy:
+        print(f'\nFAIL: heavy modules imported at startup: {", ".join(heavy[:10])}')
+        ok = False
+    if total_ms > args.budget_ms:
+        print(f'\nFAIL: startup imports took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget')
+        ok = False
+    if ok:
+        print('\nImport budget OK')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Query budget check for every endpoint in support/urls.py.
+
+Builds a throwaway SQLite database from the migrations, seeds a few bookings,
+and sends each request in CASES through the test client inside
+support.query_budget.max_queries(). That counts every query the request
+makes: session load and save, view and streamed body. It fails if an endpoint
+goes over its budget, repeats one SQL shape QUERY_REPEAT_THRESHOLD times (a
+likely N+1), or has no budget here at all. A new URL therefore needs a line in
+CASES.
+
+Budgets are for the default settings: audit rows are written behind the
+request (AUDIT_WRITE_BEHIND), so they don't count.
+
+Usage: python tools/check_query_budgets.py [-v]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asapp.settings')
+
+# (url name, method, path, JSON body, budget, session has a verified PNR)
+# Chat turns are in the order a conversation would send them
+CASES = [
+    ('home', 'get', '/', None, 0, False),
+    ('chat', 'get', '/chat', None, 0, False),
+    ('api_ready', 'get', '/api/ready', None, 0, False),
+    ('api_metrics', 'get', '/api/metrics', None, 0, False),
+    ('api_check_session', 'get', '/api/check_session', None, 1, True),
+    ('verify_pnr', 'post', '/api/verify_pnr', {'pnr': 'abc123'}, 4, False),  # creates the session
+    ('log_message', 'post', '/api/log_message', {'text': 'hi'}, 1, True),
+    ('process_message', 'post', '/process', {'message': 'show my bookings'}, 2, True),
+    ('process_message', 'post', '/process', {'message': 'flight status', 'booking_id': 1}, 3, True),
+    ('process_message', 'post', '/process', {'message': 'cancel my flight', 'booking_id': 2}, 3, True),
+    ('process_message', 'post', '/process', {'message': 'status', 'booking_id': 2}, 2, True),
+    ('process_message_stream', 'post', '/process/stream', {'message': 'show my bookings'}, 2, True),
+    ('api_book_ticket', 'post', '/api/book', {
+        'pnr': 'new001', 'flight_id': 4444, 'source_airport_code': 'JFK', 'destination_airport_code': 'SFO',
+        'scheduled_departure': '2030-01-01T10:00:00Z', 'scheduled_arrival': '2030-01-01T16:00:00Z',
+    }, 1, False),
+    ('api_list_bookings_by_pnr', 'get', '/api/bookings?pnr=ABC123', None, 1, False),
+    ('api_list_bookings_by_pnr', 'get', '/api/bookings?pnr=ABC123&limit=2', None, 1, False),
+    ('api_list_bookings_by_pnr', 'get', '/api/bookings?pnr=ABC123&stream=1', None, 1, False),
+    ('api_get_booking_by_id', 'get', '/api/bookings/1', None, 1, False),
+    ('api_can_cancel', 'post', '/api/can_cancel', {'booking_id': 1}, 0, False),
+    ('api_pet_allowed', 'post', '/api/pet_allowed', {'booking_id': 1}, 1, False),
+    ('api_get_booking', 'get', '/api/flight/booking?pnr=ABC123', None, 1, False),
+    ('api_get_booking', 'get', '/api/flight/booking?pnr=NOPE01', None, 1, False),
+    ('api_get_booking', 'get', '/api/flight/booking?pnr=ABC123&limit=2', None, 1, False),
+    ('api_cancel_booking', 'post', '/api/flight/cancel', {'booking_id': 3}, 4, False),
+    ('api_cancel_booking', 'post', '/api/flight/cancel', {'booking_id': 3}, 3, False),  # already cancelled
+    ('api_cancelled_bookings', 'get', '/api/cancelled_bookings?pnr=ABC123', None, 1, False),
+    ('api_cancelled_bookings', 'get', '/api/cancelled_bookings?pnr=ABC123&stream=1', None, 1, False),
+    ('api_available_seats', 'post', '/api/flight/available_seats', {'pnr': 'ABC123'}, 0, False),
+]
+
+
+def seed():
+    from datetime import timedelta
+    from django.utils import timezone
+    from support.models import Booking, CancelledBooking
+
+    now = timezone.now()
+    bookings = [
+        Booking(pnr='ABC123', flight_id=1000 + i, source_airport_code='JFK', destination_airport_code='LAX',
+                scheduled_departure=now + timedelta(days=i), scheduled_arrival=now + timedelta(days=i, hours=6),
+                assigned_seat=f'{i + 1}A')
+        for i in range(8)
+    ]
+    Booking.objects.bulk_create(bookings)
+    # Enough cancellations that a per-row lookup would show up as a repeated shape
+    for booking in Booking.objects.order_by('-id')[:4]:
+        booking.current_status = 'Cancelled'
+        booking.save()
+        CancelledBooking.objects.create(booking=booking, cancellation_charges=50, refund_amount=0, refund_date=now)
+
+
+def run_case(client_for, case, verbose):
+    from django.conf import settings
+    from support.query_budget import QueryBudgetExceeded, max_queries
+
+    name, method, path, body, budget, verified = case
+    client = client_for(verified)
+    kwargs = {'data': json.dumps(body), 'content_type': 'application/json'} if body is not None else {}
+    try:
+        with max_queries(budget, f'{name} {method.upper()} {path}') as collector:
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+    except QueryBudgetExceeded as e:
+        return str(e)
+    repeated = collector.repeated()
+    if verbose or repeated:
+        print(f'        {collector.count} queries, {collector.time_ms:.2f} ms')
+        for shape, n in sorted(collector.shapes.items(), key=lambda kv: -kv[1]):
+            print(f'          {n}x {shape[:150]}')
+    if repeated:
+        return f'{name} {method.upper()} {path}: SQL repeated {settings.QUERY_REPEAT_THRESHOLD}+ times (possible N+1)'
+    if response.status_code >= 500:
+        return f'{name} {method.upper()} {path}: HTTP {response.status_code}'
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the queries of every request')
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+    tmp = tempfile.TemporaryDirectory()
+    for alias in settings.DATABASES:
+        settings.DATABASES[alias]['NAME'] = os.path.join(tmp.name, 'budgets.sqlite3')
+    django.setup()
+    from django.core.management import call_command
+    from django.test import Client
+    from django.urls import get_resolver
+    from support import audit
+    from support.intent_classifier import warmup
+
+    call_command('migrate', verbosity=0)
+    seed()
+    warmup()
+    verified_client = Client()
+    verified_client.post('/api/verify_pnr', json.dumps({'pnr': 'ABC123'}), content_type='application/json')
+
+    def client_for(verified):
+        return verified_client if verified else Client()
+
+    failures = []
+    for case in CASES:
+        error = run_case(client_for, case, args.verbose)
+        print(f"{'FAIL' if error else 'ok  '}  {case[0]:<26} budget {case[4]}  {case[1].upper()} {case[2]}")
+        if error:
+            for line in error.splitlines():
+                print(f'        {line[:160]}')
+            failures.append(error)
+
+    names = {p.name for p in get_resolver('support.urls').url_patterns if p.name}
+    missing = sorted(names - {case[0] for case in CASES})
+    for name in missing:
+        print(f'FAIL  {name:<26} has no query budget in CASES')
+        failures.append(name)
+
+    audit.flush()
+    tmp.cleanup()
+    if failures:
+        raise SystemExit(f'{len(failures)} query budget check{"" if len(failures) == 1 else "s"} failed')
+    print('all endpoints within their query budgets')
+
+
+if __name__ == '__main__':
+    main()
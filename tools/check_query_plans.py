@@ -0,0 +1,107 @@
+"""
+Query-plan check for the hot booking, message and audit-log queries.
+
+Builds a throwaway SQLite database from the migrations, seeds it, runs
+EXPLAIN QUERY PLAN on each query below as the ORM generates it, and fails if
+any of them reads a table with a full SCAN instead of SEARCHing an index.
+Run it after touching models, indexes or the queries in support/services.py.
+
+Usage: python tools/check_query_plans.py [-v]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asapp.settings')
+
+
+def hot_queries():
+    from support.models import Booking, CancelledBooking, Message, ProcessLog, normalize_pnr
+    from support.pagination import BOOKING_KEY, CANCELLATION_KEY, encode_cursor, keyset
+    pnr = normalize_pnr('abc123')
+    booking = Booking.objects.filter(pnr=pnr).first()
+    cursor = encode_cursor(booking.scheduled_departure, booking.id)
+    return {
+        'bookings for pnr': Booking.objects.filter(pnr=pnr),
+        'active bookings for pnr': Booking.objects.filter(pnr=pnr).exclude(current_status='Cancelled'),
+        'pnr exists': Booking.objects.filter(pnr=pnr).values('id')[:1],
+        'booking by id': Booking.objects.filter(id=booking.id),
+        'cancellations for pnr': CancelledBooking.objects.filter(booking__pnr=pnr).select_related('booking'),
+        'cancellation for booking': CancelledBooking.objects.filter(booking=booking),
+        'active bookings page after cursor':
+            keyset(Booking.objects.filter(pnr=pnr).exclude(current_status='Cancelled'), BOOKING_KEY, cursor)[:51],
+        'cancellations page after cursor':
+            keyset(CancelledBooking.objects.filter(booking__pnr=pnr).select_related('booking'),
+                   CANCELLATION_KEY, cursor)[:51],
+        'session conversation': Message.objects.filter(session_key='s1').order_by('created_at'),
+        'pnr audit trail': ProcessLog.objects.filter(pnr=pnr).order_by('-created_at'),
+    }
+
+
+def seed():
+    from datetime import timedelta
+    from django.utils import timezone
+    from support.models import Booking, CancelledBooking, Message, ProcessLog
+
+    now = timezone.now()
+    bookings = []
+    for i in range(200):
+        bookings.append(Booking(
+            pnr=f'P{i:05d}', flight_id=1000 + i % 50, source_airport_code='JFK', destination_airport_code='LAX',
+            scheduled_departure=now + timedelta(days=i % 30), scheduled_arrival=now + timedelta(days=i % 30, hours=6),
+            assigned_seat='12A', current_status='Cancelled' if i % 7 == 0 else 'Scheduled',
+        ))
+    bookings.append(Booking(pnr='ABC123', flight_id=1111, source_airport_code='JFK', destination_airport_code='LAX',
+                            scheduled_departure=now, scheduled_arrival=now, assigned_seat='1A'))
+    Booking.objects.bulk_create(bookings)
+    for b in Booking.objects.filter(current_status='Cancelled'):
+        CancelledBooking.objects.create(booking=b, cancellation_charges=50, refund_amount=0, refund_date=now)
+    Message.objects.bulk_create([Message(session_key=f's{i % 40}', sender='user', text='hi', pnr='ABC123') for i in range(400)])
+    ProcessLog.objects.bulk_create([ProcessLog(action='status', pnr=f'P{i % 200:05d}') for i in range(400)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+    tmp = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+    tmp.close()
+    settings.DATABASES['default']['NAME'] = tmp.name
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connection
+
+    try:
+        call_command('migrate', verbosity=0)
+        seed()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        failures = []
+        for name, qs in hot_queries().items():
+            sql, params = qs.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            scans = [step for step in plan if step.startswith('SCAN')]
+            print(f"{'FAIL' if scans else 'ok  '}  {name}")
+            if scans or args.verbose:
+                for step in plan:
+                    print(f'        {step}')
+            if scans:
+                failures.append(name)
+    finally:
+        connection.close()
+        os.unlink(tmp.name)
+
+    if failures:
+        raise SystemExit(f'{len(failures)} hot quer{"y" if len(failures) == 1 else "ies"} fell back to a full table scan')
+    print('all hot queries use an index')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Concurrency stress test for the cancellation path (services.cancel_booking and
+POST /api/flight/cancel).
+
+On a throwaway SQLite database it:
+  * fires --threads concurrent cancels at each of --bookings bookings, half of
+    them with a shared Idempotency-Key, and checks that no request errored,
+    every booking has exactly one CancelledBooking, and every response for a
+    booking carries the same cancellation id;
+  * counts the queries of a first cancel and of a repeat and checks they are
+    fixed (the same for every booking).
+Exits non-zero on any failure.
+
+Usage: python tools/stress_cancel.py [--threads 16] [--bookings 50] [--profile production]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asapp.settings')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--bookings', type=int, default=50)
+    parser.add_argument('--profile', choices=('development', 'production'), default=None,
+                        help='Database profile (defaults to ASAPP_DB_PROFILE)')
+    args = parser.parse_args()
+    if args.profile:
+        os.environ['ASAPP_DB_PROFILE'] = args.profile
+
+    import django
+    from django.conf import settings
+    tmp = tempfile.TemporaryDirectory()
+    for alias in settings.DATABASES:
+        settings.DATABASES[alias]['NAME'] = os.path.join(tmp.name, 'stress.sqlite3')
+    settings.AUDIT_WRITE_BEHIND = False
+    django.setup()
+
+    from datetime import timedelta
+    from django.core.management import call_command
+    from django.db import connection, connections
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+    from support import services
+    from support.models import Booking, CancelledBooking
+
+    call_command('migrate', verbosity=0)
+    now = timezone.now()
+    Booking.objects.bulk_create([
+        Booking(pnr=f'S{i:05d}', flight_id=1000 + i, source_airport_code='JFK', destination_airport_code='LAX',
+                scheduled_departure=now + timedelta(days=1), scheduled_arrival=now + timedelta(days=1, hours=6))
+        for i in range(args.bookings + 2)
+    ])
+    ids = list(Booking.objects.order_by('id').values_list('id', flat=True))
+    probe_ids, ids = ids[:2], ids[2:]
+    failures = []
+
+    # Fixed query count per cancel
+    counts = defaultdict(set)
+    for booking_id in probe_ids:
+        for label in ('first', 'repeat'):
+            with CaptureQueriesContext(connection) as ctx:
+                services.cancel_booking(booking_id)
+            counts[label].add(len(ctx.captured_queries))
+    for label, seen in counts.items():
+        print(f'queries per {label} cancel: {sorted(seen)}')
+        if len(seen) != 1:
+            failures.append(f'{label} cancel query count varies: {sorted(seen)}')
+
+    # Concurrent cancels
+    responses = defaultdict(list)
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+
+    def hammer(n):
+        client = Client()
+        barrier.wait()
+        for booking_id in ids:
+            headers = {'HTTP_IDEMPOTENCY_KEY': f'cancel-{booking_id}'} if n % 2 else {}
+            try:
+                r = client.post('/api/flight/cancel', json.dumps({'booking_id': booking_id}),
+                                content_type='application/json', **headers)
+                with lock:
+                    if r.status_code != 200:
+                        errors.append(f'booking {booking_id}: HTTP {r.status_code} {r.content[:200]!r}')
+                    else:
+                        responses[booking_id].append(r.json()['id'])
+            except Exception as e:
+                with lock:
+                    errors.append(f'booking {booking_id}: {type(e).__name__}: {e}')
+        connections.close_all()
+
+    threads = [threading.Thread(target=hammer, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    per_booking = Counter(CancelledBooking.objects.filter(booking_id__in=ids).values_list('booking_id', flat=True))
+    multiple = [b for b, n in per_booking.items() if n != 1]
+    missing = [b for b in ids if b not in per_booking]
+    divergent = [b for b, seen in responses.items() if len(set(seen)) != 1]
+    print(f'{args.threads} threads x {len(ids)} bookings: {sum(len(v) for v in responses.values())} ok responses, '
+          f'{len(errors)} errors')
+    failures += errors[:10]
+    if multiple or missing:
+        failures.append(f'bookings without exactly one cancellation: {multiple + missing}')
+    if divergent:
+        failures.append(f'bookings with differing cancellation ids in responses: {divergent}')
+    not_cancelled = Booking.objects.filter(id__in=ids).exclude(current_status='Cancelled').count()
+    if not_cancelled:
+        failures.append(f'{not_cancelled} bookings not marked Cancelled')
+
+    tmp.cleanup()
+    if failures:
+        for failure in failures:
+            print(f'FAIL {failure}')
+        raise SystemExit(1)
+    print('ok')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Checks for the keyword fast path (KeywordMatcher.unambiguous and the keyword
+tier of IntentClassifier.classify_batch): only whole keywords, or their listed
+forms, may answer a query without the model, and never when the caller's
+threshold is at or above KEYWORD_SCORE.
+
+Needs no model or database. Exits non-zero on the first failure.
+
+Usage: python tools/test_keyword_fast_path.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Queries that contain a keyword only inside another word: the model decides these
+NOT_FAST_PATH = [
+    'is there catering on board',   # cat
+    'petrol price',                 # pet
+    'any dogma',                    # dog
+    'can i take a shower',          # show
+    'locate my bag',                # cat
+    'what is the seating plan',     # seat
+    'concatenate',                  # cat
+]
+
+FAST_PATH = {
+    'cancel my flight': 'cancel',
+    'i want a cancellation': 'cancel',
+    'my flight was cancelled': 'cancel',
+    'can i bring my pets': 'pets',
+    'are dogs allowed': 'pets',
+    'change my seats': 'seat',
+    'show my bookings': 'booked_flights',
+    'is my flight delayed': 'status',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+
+    from support.intent_classifier import KEYWORD_SCORE, IntentClassifier, _keyword_matcher
+
+    failures = []
+    for query in NOT_FAST_PATH:
+        intent = _keyword_matcher.unambiguous(query)
+        if intent is not None:
+            failures.append(f'{query!r} took the fast path as {intent!r}')
+    for query, expected in FAST_PATH.items():
+        intent = _keyword_matcher.unambiguous(query)
+        if intent != expected:
+            failures.append(f'{query!r} gave {intent!r}, expected {expected!r}')
+
+    query = 'can i bring my pets'
+    if IntentClassifier._keyword_tier(query, 0.5) != 'pets':
+        failures.append(f'{query!r} skipped the fast path below KEYWORD_SCORE')
+    for threshold in (KEYWORD_SCORE, 0.9):
+        intent = IntentClassifier._keyword_tier(query, threshold)
+        if intent is not None:
+            failures.append(f'{query!r} took the fast path at threshold {threshold} (KEYWORD_SCORE {KEYWORD_SCORE})')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    if failures:
+        raise SystemExit(1)
+    print(f'ok ({len(NOT_FAST_PATH) + len(FAST_PATH) + 3} checks)')
+
+
+if __name__ == '__main__':
+    main()